@@ -1,12 +1,16 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
+from sqlalchemy import engine_from_config, create_engine
 from sqlalchemy import pool
 
 from alembic import context
 from models.base import SQLModel
 
-from database import engine
+from database import database_url
+
+# Engine próprio das migrações: sem pool e sem o statement_timeout
+# do perfil de produção, já que migrações podem demorar.
+engine = create_engine(database_url, poolclass=pool.NullPool)
 
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,45 @@
+"""add_relato_filter_composite_indexes
+
+Revision ID: 3f6a9d2c8b14
+Revises: b7d1e4a9c362
+Create Date: 2026-10-17 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a9d2c8b14'
+down_revision: Union[str, Sequence[str], None] = 'b7d1e4a9c362'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Índices compostos para os filtros por categoria e por autor (/relato/query,
+    # /relato/categoria/{id}, /relato/usuario/{id} e /relato/my). A igualdade na
+    # primeira coluna e o (data_furto, id) em seguida atendem o filtro, a ordenação
+    # e o seek do cursor sem sort. Também substituem a falta de índice nas FKs.
+    op.create_index(
+        'ix_relato_categoria_data_furto_id',
+        'relato',
+        ['categoria_id', 'data_furto', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_relato_usuario_data_furto_id',
+        'relato',
+        ['usuario_id', 'data_furto', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_relato_usuario_data_furto_id', table_name='relato')
+    op.drop_index('ix_relato_categoria_data_furto_id', table_name='relato')
@@ -0,0 +1,37 @@
+"""add_keyset_index_on_data_furto_id
+
+Revision ID: 4b9e2d7a1c03
+Revises: 681f7354e9e3
+Create Date: 2026-10-17 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9e2d7a1c03'
+down_revision: Union[str, Sequence[str], None] = '681f7354e9e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Índice composto usado pela paginação por cursor (keyset) em (data_furto, id).
+    # Com ele, "WHERE (data_furto, id) < (:d, :id) ORDER BY data_furto DESC, id DESC LIMIT n"
+    # vira um index scan que começa direto no ponto do cursor, sem descartar linhas.
+    op.create_index(
+        'ix_relato_data_furto_id',
+        'relato',
+        ['data_furto', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_relato_data_furto_id', table_name='relato')
@@ -0,0 +1,58 @@
+"""make_search_vector_generated
+
+Revision ID: 5a8f3c1d9e27
+Revises: e2c7a95b4d18
+Create Date: 2026-10-17 14:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8f3c1d9e27'
+down_revision: Union[str, Sequence[str], None] = 'e2c7a95b4d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Remove o índice e a coluna antiga (preenchida pela API com um UPDATE extra)
+    op.drop_index('ix_relato_search_vector', table_name='relato', postgresql_using='gin')
+    op.drop_column('relato', 'search_vector')
+
+    # 2. Recria como coluna gerada: o Postgres recalcula o vetor em todo INSERT/UPDATE
+    # de obj_roubado ou descricao (e preenche os registros existentes agora)
+    op.add_column(
+        'relato',
+        sa.Column(
+            'search_vector',
+            TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('portuguese'::regconfig, coalesce(obj_roubado, '') || ' ' || coalesce(descricao, ''))",
+                persisted=True
+            ),
+            nullable=True
+        )
+    )
+
+    # 3. Índice GIN para a busca textual
+    op.create_index('ix_relato_search_vector', 'relato', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_relato_search_vector', table_name='relato', postgresql_using='gin')
+    op.drop_column('relato', 'search_vector')
+
+    op.add_column('relato', sa.Column('search_vector', TSVECTOR(), nullable=True))
+    op.execute("""
+        UPDATE relato
+        SET search_vector = to_tsvector('portuguese', obj_roubado || ' ' || descricao)
+    """)
+    op.create_index('ix_relato_search_vector', 'relato', ['search_vector'], unique=False, postgresql_using='gin')
@@ -0,0 +1,45 @@
+"""add_numero_confirmacoes_counter
+
+Revision ID: 8d31f0c6a2e5
+Revises: 4b9e2d7a1c03
+Create Date: 2026-10-17 11:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d31f0c6a2e5'
+down_revision: Union[str, Sequence[str], None] = '4b9e2d7a1c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Contador de confirmações mantido pelo toggle_confirmacao
+    op.add_column(
+        'relato',
+        sa.Column('numero_confirmacoes', sa.Integer(), server_default='0', nullable=False)
+    )
+
+    # 2. Preenche o contador com as confirmações já existentes
+    op.execute("""
+        UPDATE relato r
+        SET numero_confirmacoes = c.total
+        FROM (
+            SELECT relato_id, COUNT(*) AS total
+            FROM confirmacao_relato
+            GROUP BY relato_id
+        ) c
+        WHERE c.relato_id = r.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('relato', 'numero_confirmacoes')
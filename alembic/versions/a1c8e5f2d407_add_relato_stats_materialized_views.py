@@ -0,0 +1,54 @@
+"""add_relato_stats_materialized_views
+
+Revision ID: a1c8e5f2d407
+Revises: 3f6a9d2c8b14
+Create Date: 2026-10-17 15:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c8e5f2d407'
+down_revision: Union[str, Sequence[str], None] = '3f6a9d2c8b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Totais gerais (uma única linha), lidos pelo /stats/geral.
+    # `atualizado_em` registra quando a view foi recalculada pela última vez.
+    op.execute("""
+        CREATE MATERIALIZED VIEW relato_stats_geral AS
+        SELECT 1 AS id,
+               COUNT(*) AS total_geral,
+               COUNT(*) FILTER (WHERE data_furto >= localtimestamp - interval '30 days') AS total_30_dias,
+               now() AS atualizado_em
+        FROM relato
+    """)
+    op.create_index('ix_relato_stats_geral_id', 'relato_stats_geral', ['id'], unique=True)
+
+    # 2. Quantidade de relatos por categoria, lida pelo /stats/categorias
+    op.execute("""
+        CREATE MATERIALIZED VIEW relato_stats_categoria AS
+        SELECT c.id AS categoria_id,
+               c.nome AS categoria,
+               COUNT(*) AS quantidade,
+               now() AS atualizado_em
+        FROM categoria c
+        JOIN relato r ON r.categoria_id = c.id
+        GROUP BY c.id, c.nome
+    """)
+    # Índices únicos: exigidos pelo REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('ix_relato_stats_categoria_id', 'relato_stats_categoria', ['categoria_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS relato_stats_categoria")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS relato_stats_geral")
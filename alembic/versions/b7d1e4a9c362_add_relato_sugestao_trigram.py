@@ -0,0 +1,55 @@
+"""add_relato_sugestao_trigram
+
+Revision ID: b7d1e4a9c362
+Revises: 5a8f3c1d9e27
+Create Date: 2026-10-17 14:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d1e4a9c362'
+down_revision: Union[str, Sequence[str], None] = '5a8f3c1d9e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+
+    # 1. Termos distintos de obj_roubado e local (normalizados em minúsculas), com a
+    # grafia mais comum e a quantidade de relatos. Usada pelo /relato/search/suggest:
+    # buscar aqui evita agrupar milhares de relatos repetidos a cada tecla digitada.
+    op.execute("""
+        CREATE MATERIALIZED VIEW relato_sugestao AS
+        SELECT campo,
+               chave,
+               mode() WITHIN GROUP (ORDER BY termo) AS termo,
+               COUNT(*) AS quantidade
+        FROM (
+            SELECT 'obj_roubado' AS campo, lower(btrim(obj_roubado)) AS chave, btrim(obj_roubado) AS termo
+            FROM relato
+            UNION ALL
+            SELECT 'local', lower(btrim(local)), btrim(local)
+            FROM relato
+        ) t
+        WHERE chave <> ''
+        GROUP BY campo, chave
+    """)
+
+    # 2. Índice único (exigido pelo REFRESH MATERIALIZED VIEW CONCURRENTLY)
+    op.create_index('ix_relato_sugestao_campo_chave', 'relato_sugestao', ['campo', 'chave'], unique=True)
+
+    # 3. Índice de trigramas: atende tanto o prefixo (LIKE 'celu%') quanto o operador <% (word_similarity)
+    op.execute("CREATE INDEX ix_relato_sugestao_chave_trgm ON relato_sugestao USING gin (chave gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS relato_sugestao")
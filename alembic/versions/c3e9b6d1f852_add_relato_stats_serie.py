@@ -0,0 +1,50 @@
+"""add_relato_stats_serie
+
+Revision ID: c3e9b6d1f852
+Revises: a1c8e5f2d407
+Create Date: 2026-10-17 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9b6d1f852'
+down_revision: Union[str, Sequence[str], None] = 'a1c8e5f2d407'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Quantidade de relatos por bucket de tempo (dia, semana e mês) e categoria, usada
+    # pelo /stats/series. Só guarda os buckets já fechados no momento do refresh;
+    # o bucket aberto (e os que fecharam desde então) é contado na hora.
+    op.execute("""
+        CREATE MATERIALIZED VIEW relato_stats_serie AS
+        SELECT g.granularidade,
+               date_trunc(g.granularidade, r.data_furto) AS bucket,
+               r.categoria_id,
+               COUNT(*) AS quantidade
+        FROM relato r
+        CROSS JOIN (VALUES ('day'), ('week'), ('month')) AS g(granularidade)
+        WHERE r.data_furto < date_trunc(g.granularidade, localtimestamp)
+        GROUP BY 1, 2, 3
+    """)
+
+    # Índice único (REFRESH CONCURRENTLY) que também atende a leitura por granularidade e período
+    op.create_index(
+        'ix_relato_stats_serie_granularidade_bucket',
+        'relato_stats_serie',
+        ['granularidade', 'bucket', 'categoria_id'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS relato_stats_serie")
@@ -0,0 +1,33 @@
+"""add_fotorelato_thumbnail_url
+
+Revision ID: d4b7f2e9a615
+Revises: c3e9b6d1f852
+Create Date: 2026-10-17 17:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b7f2e9a615'
+down_revision: Union[str, Sequence[str], None] = 'c3e9b6d1f852'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Miniatura gerada no upload; fotos antigas ficam sem (NULL)
+    op.add_column(
+        'fotorelato',
+        sa.Column('thumbnail_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('fotorelato', 'thumbnail_url')
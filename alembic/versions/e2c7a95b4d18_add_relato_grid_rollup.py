@@ -0,0 +1,58 @@
+"""add_relato_grid_rollup
+
+Revision ID: e2c7a95b4d18
+Revises: 8d31f0c6a2e5
+Create Date: 2026-10-17 13:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c7a95b4d18'
+down_revision: Union[str, Sequence[str], None] = '8d31f0c6a2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Tabela com a contagem de relatos por célula da grade, pré-agregada
+    # por zoom (0 a 6), mês e categoria. Usada pelo /heatmap/grid nos zooms baixos.
+    op.create_table(
+        'relato_grid_rollup',
+        sa.Column('zoom', sa.SmallInteger(), nullable=False),
+        sa.Column('mes', sa.Date(), nullable=False),
+        sa.Column('categoria_id', sa.Integer(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('zoom', 'mes', 'categoria_id', 'latitude', 'longitude')
+    )
+
+    # 2. Carga inicial (mesma consulta de heatmap_service.rebuild_grid_rollups,
+    # com 8 células por tile)
+    op.execute("""
+        INSERT INTO relato_grid_rollup (zoom, mes, categoria_id, latitude, longitude, quantidade)
+        SELECT z.zoom,
+               date_trunc('month', r.data_furto)::date AS mes,
+               r.categoria_id,
+               ST_Y(s.celula) AS latitude,
+               ST_X(s.celula) AS longitude,
+               COUNT(*) AS quantidade
+        FROM relato r
+        CROSS JOIN generate_series(0, 6) AS z(zoom)
+        CROSS JOIN LATERAL (
+            SELECT ST_SnapToGrid(ST_MakePoint(r.longitude, r.latitude), 360.0 / (2 ^ z.zoom) / 8) AS celula
+        ) s
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('relato_grid_rollup')
@@ -0,0 +1,35 @@
+"""add_relato_localizacao_geom_index
+
+Revision ID: f8a3c6e1b259
+Revises: d4b7f2e9a615
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8a3c6e1b259'
+down_revision: Union[str, Sequence[str], None] = 'd4b7f2e9a615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Índice GiST da localização como geometry (lon/lat planos, SRID 4326).
+    # Filtros por retângulo (tiles, bbox) usam `localizacao_geog::geometry && envelope`:
+    # em geography, envelopes com 180° ou mais de largura degeneram (z=0, z=1, mundo todo).
+    op.execute("""
+        CREATE INDEX ix_relato_localizacao_geom_gist
+        ON relato USING gist ((localizacao_geog::geometry))
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_relato_localizacao_geom_gist', table_name='relato')
@@ -1,3 +1,3 @@
 from .auth import validate_jwt
-from .auth import get_jwks_client
-from .auth import jwks_client
\ No newline at end of file
+from .auth import init_jwks
+from .auth import run_jwks_refresh_loop
@@ -1,8 +1,17 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
 import requests
 import jwt
+from cryptography.hazmat.primitives import serialization
 from fastapi import HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordBearer
 
+from services.cache_service import LRUCache
+
 KEYCLOAK_SERVER_URL = "https://kc.gabiruka.duckdns.org"
 KEYCLOAK_REALM = "aricrimes"
 KEYCLOAK_CLIENT_ID = "flutter-app"
@@ -11,35 +20,204 @@ KEYCLOAK_CLIENT_ID = "flutter-app"
 WELL_KNOWN_URL = f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/.well-known/openid-configuration"
 
 
-jwks_client: jwt.PyJWKClient | None = None
+# Chaves públicas de assinatura (PyJWK) por `kid`. Substituído por inteiro a cada
+# carga, então as leituras nunca veem um conjunto pela metade.
+signing_keys: dict[str, jwt.PyJWK] = {}
+
+# Carga rápida na inicialização, sem rede: JWKS em um arquivo ou direto na variável
+KEYCLOAK_JWKS_FILE = os.getenv("KEYCLOAK_JWKS_FILE")
+KEYCLOAK_JWKS_JSON = os.getenv("KEYCLOAK_JWKS_JSON")
+
+# Modo offline (testes/desenvolvimento): valida tokens assinados com esta chave privada
+# local (ver scripts/issue_test_token.py) e nunca consulta o Keycloak.
+AUTH_OFFLINE_PRIVATE_KEY_FILE = os.getenv("AUTH_OFFLINE_PRIVATE_KEY_FILE")
+OFFLINE_KID = "offline"
+
+JWKS_HTTP_TIMEOUT_SECONDS = float(os.getenv("JWKS_HTTP_TIMEOUT_SECONDS", "5"))
+# Intervalo da atualização periódica das chaves em segundo plano; 0 desativa
+# (o laço continua rodando para as novas tentativas e as buscas por `kid` desconhecido)
+JWKS_REFRESH_SECONDS = float(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+# Intervalo mínimo entre buscas disparadas por um `kid` desconhecido
+JWKS_MIN_REFETCH_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_SECONDS", "30"))
+# Primeira espera para tentar de novo após uma busca que falhou (dobra a cada
+# falha, até JWKS_REFRESH_SECONDS ou 600s)
+JWKS_RETRY_SECONDS = float(os.getenv("JWKS_RETRY_SECONDS", "5"))
+
+# Laço de atualização em execução e o evento que o acorda antes da hora
+# (definidos por run_jwks_refresh_loop; usados por request_jwks_refresh)
+_refresh_loop: asyncio.AbstractEventLoop | None = None
+_refresh_event: asyncio.Event | None = None
 
+# Payloads de tokens já verificados, por hash SHA-256 do token. O app reenvia o mesmo
+# token em toda requisição; com o cache a verificação RSA é feita uma vez por token.
+# Cada item expira TOKEN_CACHE_EXPIRY_MARGIN_SECONDS antes do `exp` do token.
+TOKEN_CACHE = LRUCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+TOKEN_CACHE_EXPIRY_MARGIN_SECONDS = float(os.getenv("TOKEN_CACHE_EXPIRY_MARGIN_SECONDS", "10"))
 
 
+def load_jwks(jwks: dict) -> int:
+    """Substitui as chaves de assinatura pelas do JWKS informado. Retorna quantas foram carregadas."""
+    global signing_keys
+    keys = {
+        key.key_id: key
+        for key in jwt.PyJWKSet.from_dict(jwks).keys
+        if key.key_id and key.public_key_use in (None, "sig")
+    }
+    signing_keys = keys
+    return len(keys)
 
-def get_jwks_client():
+
+def load_offline_key(private_key_file: str) -> None:
+    """Usa a chave pública do par local (modo offline) como única chave de assinatura."""
+    with open(private_key_file, "rb") as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    load_jwks({"keys": [{**jwk, "kid": OFFLINE_KID, "use": "sig", "alg": "RS256"}]})
+
+
+def load_local_jwks() -> bool:
     """
-    Busca o documento de descoberta, encontra a URL do JWKS e retorna um
-    cliente PyJWKClient que busca e armazena as chaves em cache.
+    Carrega as chaves sem acessar a rede: modo offline, KEYCLOAK_JWKS_FILE ou KEYCLOAK_JWKS_JSON.
+    Retorna False se nenhuma dessas fontes estiver configurada.
     """
-    try:
-        oidc_config = requests.get(WELL_KNOWN_URL).json()
-        jwks_uri = oidc_config["jwks_uri"]
+    if AUTH_OFFLINE_PRIVATE_KEY_FILE:
+        load_offline_key(AUTH_OFFLINE_PRIVATE_KEY_FILE)
+        return True
 
-        return jwt.PyJWKClient(jwks_uri)
+    if KEYCLOAK_JWKS_FILE:
+        with open(KEYCLOAK_JWKS_FILE) as f:
+            load_jwks(json.load(f))
+        return True
+
+    if KEYCLOAK_JWKS_JSON:
+        load_jwks(json.loads(KEYCLOAK_JWKS_JSON))
+        return True
+
+    return False
+
+
+def fetch_jwks() -> int:
+    """
+    Busca o documento de descoberta do Keycloak, encontra a URL do JWKS e carrega
+    as chaves. Bloqueante (requests, com timeout): no event loop use asyncio.to_thread.
+    """
+    try:
+        oidc_config = requests.get(WELL_KNOWN_URL, timeout=JWKS_HTTP_TIMEOUT_SECONDS).json()
+        jwks = requests.get(oidc_config["jwks_uri"], timeout=JWKS_HTTP_TIMEOUT_SECONDS).json()
     except requests.exceptions.RequestException as e:
-        # Em um app real, adicione logging aqui
-        raise Exception(f"Não foi possível conectar ao Keycloak para obter a configuração OIDC: {e}")
+        raise Exception(f"Não foi possível conectar ao Keycloak para obter as chaves (JWKS): {e}")
 
+    return load_jwks(jwks)
 
 
+async def init_jwks() -> None:
+    """
+    Carrega as chaves na inicialização. Usa a fonte local se houver; senão busca no
+    Keycloak com timeout. Uma falha não impede a API de subir: a atualização em
+    segundo plano tenta de novo em JWKS_RETRY_SECONDS.
+    """
+    if load_local_jwks():
+        print(f"🔑 {len(signing_keys)} chave(s) JWKS carregada(s) localmente.")
+        return
+
+    try:
+        quantidade = await asyncio.to_thread(fetch_jwks)
+        print(f"🔑 {quantidade} chave(s) JWKS carregada(s) do Keycloak.")
+    except Exception as e:
+        print(f"⚠️ {e}")
+
+
+def request_jwks_refresh() -> None:
+    """
+    Pede ao laço de atualização uma busca do JWKS agora (respeitando o intervalo
+    mínimo). Não bloqueia e pode ser chamada de qualquer thread.
+    """
+    if _refresh_loop is not None and _refresh_event is not None:
+        _refresh_loop.call_soon_threadsafe(_refresh_event.set)
+
+
+async def run_jwks_refresh_loop(interval_seconds: float = JWKS_REFRESH_SECONDS) -> None:
+    """
+    Laço em segundo plano (iniciado no lifespan) que recarrega as chaves do Keycloak:
+    - a cada `interval_seconds` (se > 0);
+    - logo após uma falha ou sem nenhuma chave carregada, com espera crescente a partir
+      de JWKS_RETRY_SECONDS (ex.: o Keycloak estava fora do ar na inicialização);
+    - quando uma requisição traz um `kid` desconhecido (request_jwks_refresh), no máximo
+      uma vez a cada JWKS_MIN_REFETCH_SECONDS.
+
+    As requisições nunca esperam por essa busca: com `kid` desconhecido recebem 401.
+    """
+    global _refresh_loop, _refresh_event
+    _refresh_loop = asyncio.get_running_loop()
+    _refresh_event = asyncio.Event()
+
+    intervalo = interval_seconds if interval_seconds > 0 else None
+    espera_maxima = interval_seconds if interval_seconds > 0 else 600.0
+    falhas = 0 if signing_keys else 1
+    # A carga do init_jwks acabou de acontecer (ou falhar)
+    proxima_permitida = time.monotonic() + (JWKS_MIN_REFETCH_SECONDS if signing_keys else JWKS_RETRY_SECONDS)
+
+    try:
+        while True:
+            espera = min(JWKS_RETRY_SECONDS * 2 ** (falhas - 1), espera_maxima) if falhas else intervalo
+            try:
+                await asyncio.wait_for(_refresh_event.wait(), timeout=espera)
+            except TimeoutError:
+                pass
+
+            atraso = proxima_permitida - time.monotonic()
+            if atraso > 0:
+                await asyncio.sleep(atraso)
+            # Pedidos feitos até aqui são atendidos por esta busca
+            _refresh_event.clear()
+
+            try:
+                quantidade = await asyncio.to_thread(fetch_jwks)
+                if falhas:
+                    print(f"🔑 {quantidade} chave(s) JWKS carregada(s) do Keycloak.")
+                falhas = 0
+                proxima_permitida = time.monotonic() + JWKS_MIN_REFETCH_SECONDS
+            except Exception as e:
+                falhas += 1
+                print(f"⚠️ Erro ao atualizar as chaves JWKS (tentativa {falhas}): {e}")
+                proxima_permitida = time.monotonic() + min(JWKS_RETRY_SECONDS * 2 ** (falhas - 1), espera_maxima)
+    finally:
+        _refresh_loop = None
+        _refresh_event = None
+
+
+def get_signing_key(token: str) -> jwt.PyJWK:
+    """
+    Chave pública para o `kid` do cabeçalho do token, já carregada em memória.
+    Com `kid` desconhecido (rotação de chave antes da próxima atualização, ou
+    Keycloak fora do ar na inicialização), pede a busca ao laço em segundo plano e
+    rejeita o token: a requisição nunca espera pela rede.
+    """
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = signing_keys.get(kid)
+    if key is not None:
+        return key
+
+    if not AUTH_OFFLINE_PRIVATE_KEY_FILE:
+        request_jwks_refresh()
+
+    raise jwt.InvalidTokenError(f"Chave de assinatura desconhecida (kid={kid}).")
+
 
 def validate_jwt(token: str) -> dict:
     """
     Valida um token JWT do Keycloak usando PyJWT de forma universal.
+    Tokens já validados são servidos do TOKEN_CACHE até pouco antes de expirarem.
     """
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = TOKEN_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # 1. Pega o 'kid' (Key ID) do cabeçalho do token
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        signing_key = get_signing_key(token)
 
         # 2. Decodifica e valida o token
         # Esta única chamada faz tudo:
@@ -54,7 +232,6 @@ def validate_jwt(token: str) -> dict:
             audience=KEYCLOAK_CLIENT_ID,
             issuer=f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}"
         )
-        return payload
 
     # Captura exceções específicas para dar erros mais claros
     except jwt.ExpiredSignatureError:
@@ -70,5 +247,9 @@ def validate_jwt(token: str) -> dict:
         # Outros erros (ex: falha de rede ao buscar chaves)
         raise HTTPException(status_code=500, detail=f"Erro interno ao validar o token: {e}")
 
+    # Só guarda se ainda faltar mais que a margem para o token expirar
+    ttl = payload.get("exp", 0) - time.time() - TOKEN_CACHE_EXPIRY_MARGIN_SECONDS
+    if ttl > 0:
+        TOKEN_CACHE.set(cache_key, payload, ttl_seconds=ttl)
 
-
+    return payload
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+
+import database
+from database import SessionDep
+import services.maintenance_service as maintenance_service
+from auth import auth
+from services.tile_service import TILE_CACHE
+from services.suggestion_service import SUGGESTION_CACHE
+from services.auth_service import USER_CACHE, get_current_admin_user
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/db/pool")
+def get_db_pool_status(user=Depends(get_current_admin_user)):
+    """
+    Estado dos pools de conexão deste worker, um por engine (`sync` e `async`):
+    conexões em uso, livres e em overflow, além de quantos checkouts precisaram
+    esperar (e quantos estouraram o `pool_timeout`).
+    Também retorna a configuração dos pools e dos timeouts em uso.
+    **Requer permissão de Admin.**
+    """
+    return database.pool_status()
+
+
+@router.get("/caches")
+def get_cache_stats(user=Depends(get_current_admin_user)):
+    """
+    Tamanho e acertos/erros dos caches em memória deste worker.
+    **Requer permissão de Admin.**
+    """
+    return {
+        "tokens": auth.TOKEN_CACHE.stats(),
+        "usuarios": USER_CACHE.stats(),
+        "tiles": TILE_CACHE.stats(),
+        "sugestoes": SUGGESTION_CACHE.stats(),
+    }
+
+
+@router.post("/materialized-views/refresh")
+def refresh_materialized_views(db: SessionDep, user=Depends(get_current_admin_user)):
+    """
+    Atualiza agora as views materializadas (estatísticas e sugestões), sem esperar o agendamento.
+    `refreshed` é falso se outro worker já estava atualizando.
+    **Requer permissão de Admin.**
+    """
+    refreshed = maintenance_service.refresh_materialized_views(db)
+    return {"success": True, "refreshed": refreshed, "views": list(maintenance_service.MATERIALIZED_VIEWS)}
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
-from database import SessionDep
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Response, status
+from database import AsyncSessionDep
 from models import Usuario
-from dtos import FotoRelatoResponseDto
+from dtos import FotoRelatoResponseDto, FotoRelatoBatchResponseDto, FotoUploadResultDto
 
 from services.auth_service import get_current_user
 import services.foto_relato_service as foto_relato_service
@@ -9,6 +9,9 @@ import services.storage_service as storage_service
 
 router = APIRouter(prefix="/relato", tags=["Fotos de Relatos"])
 
+# Limite de arquivos por requisição no envio em lote
+MAX_FOTOS_POR_ENVIO = 10
+
 
 @router.post(
     "/{relato_id}/foto/",
@@ -17,24 +20,25 @@ router = APIRouter(prefix="/relato", tags=["Fotos de Relatos"])
 )
 async def upload_foto_para_relato(
         relato_id: int,
-        db: SessionDep,
+        db: AsyncSessionDep,
         user: Usuario = Depends(get_current_user),
         file: UploadFile = File(..., description="Arquivo de imagem para upload (jpg, png, etc.)")
 ):
     """
     **Sumário:** Adicionar Foto a um Relato (via Proxy).
 
-    **Descrição:** Recebe um ficheiro de imagem, o encaminha para o
-    servidor de ficheiros e associa a URL retornada a um relato existente.
+    **Descrição:** Recebe um ficheiro de imagem, reduz e reencoda a imagem (sem EXIF),
+    gera uma miniatura, encaminha ambas para o servidor de ficheiros e associa as
+    URLs retornadas a um relato existente.
 
     **Regra de Negócio:** O usuário autenticado deve ser o **proprietário** do relato para poder adicionar uma foto.
 
-    **Resposta:** O objeto da foto (com ID, URL pública e relato_id).
+    **Resposta:** O objeto da foto (com ID, URL pública, URL da miniatura e relato_id).
     """
 
     # 1. Verificar se o relato existe e se o utilizador é o dono
     try:
-        db_relato = foto_relato_service.check_relato_ownership(
+        db_relato = await foto_relato_service.check_relato_ownership(
             db=db,
             relato_id=relato_id,
             user_id=user.id
@@ -42,26 +46,136 @@ async def upload_foto_para_relato(
     except HTTPException as e:
         raise e  # Repassa o erro (403 ou 404)
 
+    # Encerra a transação de leitura: a conexão volta ao pool durante o
+    # processamento e o envio (que podem passar do idle_in_transaction_session_timeout)
+    await db.commit()
+
     # 2. Enviar o ficheiro para o file-server (Node)
     try:
-        public_url = storage_service.proxy_file_to_storage(file=file)
+        imagem = await storage_service.proxy_file_to_storage(file=file)
     except HTTPException as e:
         raise e  # Repassa o erro (400, 503, 500, etc.)
+    except Exception as e:
+        # Ex.: BrokenProcessPool no processamento da imagem
+        print(f"Erro inesperado ao enviar {file.filename}: {e!r}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro inesperado ao processar ou enviar o arquivo."
+        )
 
     # 3. Salvar a URL pública no banco de dados
     try:
-        db_foto = foto_relato_service.create_foto_relato_db(
+        db_foto = await foto_relato_service.create_foto_relato_db(
             db=db,
-            url=public_url,
+            url=imagem.url,
+            thumbnail_url=imagem.thumbnail_url,
             relato=db_relato  # Passamos o relato que já buscámos
         )
 
         return FotoRelatoResponseDto(
             id=db_foto.id,
             url=db_foto.url,
+            thumbnail_url=db_foto.thumbnail_url,
             relato_id=db_foto.relato_id
         )
-    except HTTPException as e:
-        # TODO: Se o DB falhar, a foto ficou "órfã" no file-server.
-        # Uma implementação futura pode chamar uma rota de DELETE no file-server.
-        raise e
\ No newline at end of file
+    except Exception:
+        # Os arquivos já estão no file-server: registra para limpeza manual
+        storage_service.report_orphaned(
+            [imagem.url, imagem.thumbnail_url],
+            f"falha ao salvar a foto do relato {relato_id}"
+        )
+        raise
+
+
+@router.post(
+    "/{relato_id}/fotos/",
+    response_model=FotoRelatoBatchResponseDto,
+    status_code=status.HTTP_201_CREATED,
+    responses={207: {"model": FotoRelatoBatchResponseDto, "description": "Parte dos arquivos falhou."}}
+)
+async def upload_fotos_para_relato(
+        relato_id: int,
+        db: AsyncSessionDep,
+        response: Response,
+        user: Usuario = Depends(get_current_user),
+        files: list[UploadFile] = File(..., description=f"Até {MAX_FOTOS_POR_ENVIO} arquivos de imagem")
+):
+    """
+    **Sumário:** Adicionar Várias Fotos a um Relato (via Proxy).
+
+    **Descrição:** Recebe vários ficheiros de imagem, verifica a propriedade do relato
+    uma única vez, processa e encaminha os ficheiros em paralelo para o servidor de ficheiros e
+    salva todas as URLs retornadas com um único INSERT.
+
+    **Regra de Negócio:** O usuário autenticado deve ser o **proprietário** do relato.
+
+    **Resposta:** O resultado de cada ficheiro, na ordem do envio. Se algum falhar,
+    os demais são salvos mesmo assim e o status da resposta é 207 (Multi-Status).
+    """
+    if len(files) > MAX_FOTOS_POR_ENVIO:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Envie no máximo {MAX_FOTOS_POR_ENVIO} arquivos por requisição."
+        )
+
+    # 1. Verificar se o relato existe e se o utilizador é o dono (uma vez para todos)
+    db_relato = await foto_relato_service.check_relato_ownership(
+        db=db,
+        relato_id=relato_id,
+        user_id=user.id
+    )
+    # Encerra a transação de leitura: a conexão volta ao pool durante os envios
+    await db.commit()
+
+    # 2. Enviar os ficheiros para o file-server em paralelo
+    enviados = await storage_service.proxy_files_to_storage(files)
+    imagens = [imagem for imagem in enviados if isinstance(imagem, storage_service.StoredImage)]
+
+    # 3. Salvar todas as URLs públicas de uma vez
+    db_fotos = []
+    if imagens:
+        try:
+            db_fotos = await foto_relato_service.create_fotos_relato_db(db=db, imagens=imagens, relato=db_relato)
+        except Exception:
+            storage_service.report_orphaned(
+                [url for imagem in imagens for url in imagem],
+                f"falha ao salvar as fotos do relato {relato_id}"
+            )
+            raise
+
+    # As fotos salvas vêm na ordem de `imagens`, ou seja, dos envios bem-sucedidos
+    fotos_salvas = iter(db_fotos)
+
+    results = []
+    for file, enviado in zip(files, enviados):
+        if isinstance(enviado, HTTPException):
+            results.append(FotoUploadResultDto(
+                filename=file.filename,
+                success=False,
+                status_code=enviado.status_code,
+                detail=str(enviado.detail)
+            ))
+            continue
+
+        db_foto = next(fotos_salvas)
+        results.append(FotoUploadResultDto(
+            filename=file.filename,
+            success=True,
+            foto=FotoRelatoResponseDto(
+                id=db_foto.id,
+                url=db_foto.url,
+                thumbnail_url=db_foto.thumbnail_url,
+                relato_id=db_foto.relato_id
+            )
+        ))
+
+    failed_count = len(files) - len(imagens)
+    if failed_count:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+
+    return FotoRelatoBatchResponseDto(
+        relato_id=relato_id,
+        created_count=len(imagens),
+        failed_count=failed_count,
+        results=results
+    )
@@ -1,17 +1,20 @@
 from datetime import datetime
-from typing import Optional
-from dtos.heatmap.heatmap_cicrle import HeatmapCircle
-from fastapi import APIRouter, Query
-from haversine import haversine, Unit
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from dtos.heatmap.heatmap_response import HeatmapResponse, pointsResponse
+from dtos.heatmap.heatmap_grid_response import HeatmapGridResponse
+from dtos.heatmap.heatmap_compact_response import (
+    HeatmapColumnarPoints,
+    HeatmapColumnarResponse,
+    HeatmapPolylineResponse,
+)
 
 from database import SessionDep
-from sqlmodel import select
 import numpy as np
-from sklearn.cluster import DBSCAN
 
-
-from models import Relato
+import services.heatmap_service as heatmap_service
+import services.maintenance_service as maintenance_service
+from services.auth_service import get_current_admin_user
 
 router = APIRouter(prefix="/heatmap", tags=["Mapa de Calor"])
 
@@ -22,7 +25,18 @@ def get_heatmap_data(
         start_date: Optional[datetime] = Query(None, description="Data inicial (ISO format) para filtrar os relatos"),
         end_date: Optional[datetime] = Query(None, description="Data final (ISO format) para filtrar os relatos"),
         eps_km: float = Query(0.5, description="Raio de busca (em Km) para agrupar pontos em um cluster.", gt=0),
-        min_samples: int = Query(3, description="Número mínimo de relatos para formar um cluster.", gt=0)
+        min_samples: int = Query(3, description="Número mínimo de relatos para formar um cluster.", gt=0),
+        engine: Literal["sklearn", "postgis"] = Query("sklearn", description="Onde o DBSCAN é executado."),
+        include_points: Optional[bool] = Query(
+            None, description="Se falso, retorna apenas os círculos (points vazio). "
+                              "Padrão: verdadeiro no engine sklearn, falso no postgis."
+        ),
+        format: Literal["json", "columnar", "polyline", "binary"] = Query(
+            "json", description="Formato de serialização dos pontos."
+        ),
+        precision: Optional[int] = Query(
+            None, ge=0, le=7, description="Casas decimais das coordenadas dos pontos (quantização)."
+        )
 ):
     """
         **Descrição:** Processa todos os relatos (podendo filtrar por data) e os agrupa
@@ -35,81 +49,114 @@ def get_heatmap_data(
         - `eps_km`: O raio (em km) que o algoritmo usa para agrupar pontos.
         - `min_samples`: O número mínimo de relatos necessários dentro do raio `eps_km`
           para formar um cluster.
+        - `engine`: `sklearn` (padrão) traz os pontos e roda o DBSCAN na API;
+          `postgis` roda o ST_ClusterDBSCAN no banco e traz só os resumos dos clusters.
+          Se o banco não suportar, cai para o `sklearn`.
+        - `include_points`: Se falso, os pontos individuais não são carregados nem retornados.
+          Padrão: verdadeiro com `engine=sklearn` e falso com `engine=postgis`, para que
+          só os resumos dos clusters trafeguem.
+        - `format`: Como os pontos são serializados:
+          - `json` (padrão): lista de objetos `{"lat": .., "long": ..}`.
+          - `columnar`: `{"lat": [...], "long": [...]}`.
+          - `polyline`: string no formato "Encoded Polyline" do Google, na `precision` informada (padrão 5).
+          - `binary`: corpo `application/octet-stream` little-endian: uint32 nº de círculos,
+            uint32 nº de pontos, círculos em float32 `[lat, long, radius_meters, weight]`
+            e pontos em float32 `[lat, long]`.
+        - `precision` (Opcional): Arredonda as coordenadas dos pontos para essa quantidade de casas decimais.
 
         """
-    query = select(Relato)
-    if start_date:
-        query = query.where(Relato.data_furto >= start_date)
-    if end_date:
-        query = query.where(Relato.data_furto <= end_date)
-
-    relatos = session.exec(query).all()
-
-    points: list[pointsResponse]= []
-
-    for relato in relatos:
-        points.append(pointsResponse(lat=relato.latitude, long=relato.longitude))
-
-
-
-    if len(relatos) < min_samples:
-        # Não há dados suficientes para clusterizar
-        return HeatmapResponse(circles=[], points=points)
-
-    # 2. Prepara os dados para o DBSCAN
-    # Coordenadas em [latitude, longitude]
-    coords = np.array([[r.latitude, r.longitude] for r in relatos])
-
-    # DBSCAN usa a métrica 'haversine' que espera coordenadas em radianos
-    coords_radians = np.radians(coords)
-
-    # 3. Executa o DBSCAN
-    # Converte o 'eps' (raio de busca) de Km para radianos
-    earth_radius_km = 6371.0
-    eps_rad = eps_km / earth_radius_km
+    if include_points is None:
+        include_points = engine == "sklearn"
+
+    # Os pontos só são carregados quando o DBSCAN roda na API (sklearn, ou fallback
+    # do postgis) ou quando foram pedidos na resposta
+    coords = None
+
+    circles = None
+    if engine == "postgis":
+        circles = heatmap_service.cluster_with_postgis(session, eps_km, min_samples, start_date, end_date)
+
+    if circles is None:
+        # Carrega só as coordenadas, já em um array (n, 2) de [latitude, longitude]
+        coords = heatmap_service.load_coordinates(session, start_date, end_date)
+        circles = heatmap_service.cluster_with_sklearn(coords, eps_km, min_samples)
+
+    if not include_points:
+        coords = np.empty((0, 2), dtype=np.float64)
+    elif coords is None:
+        coords = heatmap_service.load_coordinates(session, start_date, end_date)
+
+    if format == "polyline":
+        polyline_precision = 5 if precision is None else precision
+        body = HeatmapPolylineResponse.model_construct(
+            circles=circles,
+            points=heatmap_service.encode_polyline(coords, polyline_precision),
+            precision=polyline_precision
+        )
+        return Response(content=body.model_dump_json(), media_type="application/json")
 
-    # Roda o algoritmo
-    db = DBSCAN(eps=eps_rad, min_samples=min_samples, metric='haversine').fit(coords_radians)
+    coords = heatmap_service.quantize(coords, precision)
 
-    cluster_labels = db.labels_
-    unique_labels = set(cluster_labels)
+    if format == "binary":
+        return Response(
+            content=heatmap_service.pack_binary(circles, coords),
+            media_type="application/octet-stream"
+        )
 
-    heatmap_circles = []
+    if format == "columnar":
+        body = HeatmapColumnarResponse.model_construct(
+            circles=circles,
+            points=HeatmapColumnarPoints.model_construct(
+                lat=coords[:, 0].tolist(),
+                long=coords[:, 1].tolist()
+            )
+        )
+        return Response(content=body.model_dump_json(), media_type="application/json")
 
-    # 4. Processa cada cluster encontrado
-    for label in unique_labels:
-        if label == -1:
-            # label -1 é "ruído" (pontos que não pertencem a nenhum cluster)
-            continue
+    points = [pointsResponse(lat=lat, long=lon) for lat, lon in coords.tolist()]
 
-        # Pega os pontos (em graus) que pertencem a este cluster
-        cluster_mask = (cluster_labels == label)
-        cluster_points_coords = coords[cluster_mask]
+    return HeatmapResponse(circles=circles, points=points)
 
-        # 4a. Calcula o "peso" (quantos pontos tem no cluster)
-        weight = len(cluster_points_coords)
 
-        # 4b. Calcula o centro do cluster (média das latitudes e longitudes)
-        center = cluster_points_coords.mean(axis=0)
-        center_lat, center_lon = center[0], center[1]
+@router.get("/grid", response_model=HeatmapGridResponse)
+def get_heatmap_grid(
+        session: SessionDep,
+        zoom: int = Query(..., ge=0, le=22, description="Nível de zoom do mapa; define o tamanho da célula."),
+        min_lat: float = Query(..., ge=-90, le=90),
+        min_lon: float = Query(..., ge=-180, le=180),
+        max_lat: float = Query(..., ge=-90, le=90),
+        max_lon: float = Query(..., ge=-180, le=180),
+        categoria_id: Optional[int] = Query(None, description="Filtra por categoria"),
+        start_date: Optional[datetime] = Query(None, description="Data inicial (ISO format) para filtrar os relatos"),
+        end_date: Optional[datetime] = Query(None, description="Data final (ISO format) para filtrar os relatos"),
+):
+    """
+        **Descrição:** Conta os relatos por célula de uma grade quadrada dentro do
+        bounding box informado. Retorna o centro de cada célula e a quantidade de relatos.
 
-        # 4c. Calcula o raio (distância máxima do centro a qualquer ponto do cluster)
-        max_radius_meters = 0
-        center_tuple = (center_lat, center_lon)
+        O lado da célula é `360 / 2^zoom / 8` graus (8 células por tile). Até o zoom 6
+        a contagem vem de uma tabela pré-agregada por mês (`source: "rollup"`), desde que
+        o filtro de datas cubra meses inteiros; nos demais casos é agregada na hora
+        (`source: "live"`).
+        """
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bounding box inválido: os mínimos devem ser menores que os máximos."
+        )
 
-        for point in cluster_points_coords:
-            point_tuple = (point[0], point[1])
-            distance = haversine(center_tuple, point_tuple, unit=Unit.METERS)
-            if distance > max_radius_meters:
-                max_radius_meters = distance
+    return heatmap_service.get_grid_cells(
+        session, zoom, min_lat, min_lon, max_lat, max_lon, categoria_id, start_date, end_date
+    )
 
-        heatmap_circles.append(
-            HeatmapCircle(
-                latitude=center_lat,
-                longitude=center_lon,
-                radius_meters=max_radius_meters,
-                weight=weight
-            )
-        )
 
-    return HeatmapResponse(circles=heatmap_circles, points=points)
\ No newline at end of file
+@router.post("/grid/rollup/refresh")
+def refresh_heatmap_grid_rollup(session: SessionDep, user=Depends(get_current_admin_user)):
+    """
+    Recalcula a tabela pré-agregada usada pelo `/heatmap/grid` nos zooms baixos
+    (também recalculada periodicamente em segundo plano).
+    `refreshed` é falso se outro worker já estava atualizando.
+    **Requer permissão de Admin.**
+    """
+    linhas = maintenance_service.refresh_grid_rollups(session)
+    return {"success": True, "refreshed": linhas is not None, "linhas": linhas}
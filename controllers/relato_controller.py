@@ -1,22 +1,36 @@
-from typing import Annotated
+import time
+from typing import Annotated, Literal, Optional
 
-from fastapi import APIRouter, Depends, Query, status, HTTPException
+from fastapi import APIRouter, Depends, File, Query, Response, UploadFile, status, HTTPException
 from dtos.relatos.relato_delete_response import RelatoDeleteResponseDto
 from dtos import RelatoCreateDto
-from database import SessionDep
+from database import SessionDep, AsyncSessionDep
 from dtos.relatos.relato_batch_response import RelatoBatchResponseDto
+from dtos.relatos.relato_sugestao import RelatoSugestaoDto
 from models import Relato, Usuario
 from services.auth_service import get_current_user, get_current_admin_user
 import services.relato_service as relato_service
+import services.relato_async_service as relato_async_service
+import services.relato_import_service as relato_import_service
+import services.suggestion_service as suggestion_service
 from dtos import RelatoRead
 from datetime import datetime
-from services.relato_service import toggle_confirmacao, search_relatos
 from services.auth_service import get_validated_token, check_role_in_payload, REALM_ROLES_PATH
+from services.pagination_service import set_next_cursor
 
 router = APIRouter(prefix="/relato", tags=["Relato"])
 
+CursorQuery = Annotated[
+    str | None,
+    Query(description="Cursor opaco da próxima página (header X-Next-Cursor da resposta anterior). "
+                      "Quando informado, o offset é ignorado.")
+]
+
+# Os endpoints de leitura usam a sessão assíncrona (AsyncSessionDep). Os de escrita
+# ainda usam a sessão síncrona e por isso são `def`: o FastAPI os executa no
+# threadpool, sem bloquear o event loop.
 @router.post("", response_model=Relato, status_code=status.HTTP_201_CREATED)
-async def create_relato(relato: RelatoCreateDto, session: SessionDep, user = Depends(get_current_user)):
+def create_relato(relato: RelatoCreateDto, session: SessionDep, user = Depends(get_current_user)):
     """
     Cria um novo relato de crime. O relato é automaticamente
     associado ao usuário que está autenticado via token JWT.
@@ -26,61 +40,172 @@ async def create_relato(relato: RelatoCreateDto, session: SessionDep, user = Dep
 
 
 @router.get("", response_model=list[RelatoRead])
-async def get_all_relatos(db: SessionDep, offset: int=0, limit:  Annotated[int, Query(le=100)] = 100):
+async def get_all_relatos(
+        db: AsyncSessionDep,
+        response: Response,
+        offset: int=0,
+        limit:  Annotated[int, Query(le=100)] = 100,
+        cursor: CursorQuery = None
+):
     """
 
     Retorna uma lista paginada de todos os relatos no sistema,
     independentemente do usuário.
 
+    A página seguinte pode ser obtida pelo cursor devolvido no header `X-Next-Cursor`.
+
     """
 
-    return relato_service.get_all_relatos(db, offset, limit)
+    relatos = await relato_async_service.get_all_relatos(db, offset, limit, cursor)
+    relatos, next_cursor = relato_service.split_page(relatos, limit)
+    set_next_cursor(response, next_cursor)
+    return relatos
 
 
 @router.get("/my", response_model=list[RelatoRead])
 async def get_my_relatos(
-        db: SessionDep,
+        db: AsyncSessionDep,
+        response: Response,
         offset: int = 0,
         limit: Annotated[int, Query(le=100)] = 10,
+        cursor: CursorQuery = None,
         user: Usuario = Depends(get_current_user)
 
 ):
     """Pega os últimos relatos registrados, ordenados por data de registro."""
-    return relato_service.get_my_relatos(db, offset, limit, user.id)
+    relatos = await relato_async_service.get_my_relatos(db, offset, limit, user.id, cursor)
+    relatos, next_cursor = relato_service.split_page(relatos, limit)
+    set_next_cursor(response, next_cursor)
+    return relatos
 
 
 @router.get("/latest", response_model=list[RelatoRead])
 async def get_latest_relatos(
-        db: SessionDep,
+        db: AsyncSessionDep,
+        response: Response,
         offset: int = 0,
-        limit: Annotated[int, Query(le=100)] = 10
+        limit: Annotated[int, Query(le=100)] = 10,
+        cursor: CursorQuery = None
 ):
     """Pega os últimos relatos registrados, ordenados por data de registro."""
-    return relato_service.get_latest_relatos(db, offset, limit)
+    relatos = await relato_async_service.get_latest_relatos(db, offset, limit, cursor)
+    relatos, next_cursor = relato_service.split_page(relatos, limit)
+    set_next_cursor(response, next_cursor)
+    return relatos
+
+
+@router.get("/query", response_model=list[RelatoRead])
+async def query_relatos(
+        db: AsyncSessionDep,
+        response: Response,
+        categoria_id: Optional[int] = Query(None, description="Filtra por categoria"),
+        usuario_id: Optional[int] = Query(None, description="Filtra pelo autor do relato"),
+        start_date: Optional[datetime] = Query(None, description="Data inicial (ISO 8601) da data_furto"),
+        end_date: Optional[datetime] = Query(None, description="Data final (ISO 8601) da data_furto"),
+        min_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box: latitude mínima"),
+        min_lon: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box: longitude mínima"),
+        max_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box: latitude máxima"),
+        max_lon: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box: longitude máxima"),
+        lat: Optional[float] = Query(None, ge=-90, le=90, description="Raio: latitude do ponto central"),
+        lon: Optional[float] = Query(None, ge=-180, le=180, description="Raio: longitude do ponto central"),
+        radius: Optional[float] = Query(None, gt=0, le=50, description="Raio em Km (max 50)"),
+        q: Optional[str] = Query(None, min_length=1, description="Busca textual (mesma sintaxe do /search/text)"),
+        limit: Annotated[int, Query(le=100)] = 50,
+        cursor: CursorQuery = None
+):
+    """
+    Combina em uma única consulta os filtros de categoria, autor, período, área
+    (bounding box **ou** raio) e texto. Todos são opcionais e se somam (AND).
+    Ordena do furto mais recente para o mais antigo, com paginação por cursor
+    (header `X-Next-Cursor`).
+    """
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    usa_bbox = any(v is not None for v in bbox)
+    circulo = (lat, lon, radius)
+    usa_raio = any(v is not None for v in circulo)
+
+    if usa_bbox and usa_raio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe o bounding box ou o raio, não os dois."
+        )
+    if usa_bbox and (None in bbox or min_lat > max_lat or min_lon > max_lon):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bounding box inválido: informe min_lat, min_lon, max_lat e max_lon, com os mínimos menores que os máximos."
+        )
+    if usa_raio and None in circulo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Para filtrar por raio, informe lat, lon e radius."
+        )
+
+    relatos = await relato_async_service.get_relatos(
+        db,
+        limit,
+        cursor,
+        category_id=categoria_id,
+        user_id=usuario_id,
+        start_date=start_date,
+        end_date=end_date,
+        bbox=bbox if usa_bbox else None,
+        center=(lat, lon) if usa_raio else None,
+        radius_km=radius,
+        query_text=q
+    )
+    relatos, next_cursor = relato_service.split_page(relatos, limit)
+    set_next_cursor(response, next_cursor)
+    return relatos
 
 
 @router.get("/nearby", response_model=list[RelatoRead])
 async def get_relatos_nearby(
-        db: SessionDep,
+        db: AsyncSessionDep,
+        response: Response,
         lat: float = Query(..., description="Latitude do ponto central", example=-9.9740),
         lon: float = Query(..., description="Longitude do ponto central", example=-63.0331),
         radius: float = Query(2.0, description="Raio em Km (max 50)", gt=0, le=50),
+        categoria_id: Optional[int] = Query(None, description="Filtra por categoria"),
+        start_date: Optional[datetime] = Query(None, description="Data inicial (ISO 8601) da data_furto"),
+        end_date: Optional[datetime] = Query(None, description="Data final (ISO 8601) da data_furto"),
+        limit: Annotated[int, Query(le=100)] = 50,
+        cursor: CursorQuery = None
 ):
-    """Busca relatos em um raio (em Km) de um ponto central."""
-    return relato_service.get_relatos_nearby(db=db, latitude=lat, longitude=lon, radius_km=radius)
+    """
+    Busca relatos em um raio (em Km) de um ponto central, ordenados do mais próximo
+    ao mais distante. Cada relato traz a distância (`distance_m`) até o ponto central.
+    """
+    rows = await relato_async_service.get_relatos_nearby(
+        db=db,
+        latitude=lat,
+        longitude=lon,
+        radius_km=radius,
+        limit=limit,
+        cursor=cursor,
+        category_id=categoria_id,
+        start_date=start_date,
+        end_date=end_date
+    )
+    rows, next_cursor = relato_service.split_nearby_page(rows, limit)
+    set_next_cursor(response, next_cursor)
+
+    return [
+        RelatoRead.model_validate(relato, update={"distance_m": distancia})
+        for relato, distancia in rows
+    ]
 
 
 @router.get("/{relato_id}", response_model=RelatoRead)
-async def get_relato_by_id(relato_id: int, db: SessionDep):
+async def get_relato_by_id(relato_id: int, db: AsyncSessionDep):
     """Pega um relato específico pelo ID."""
-    relato = relato_service.get_relato_by_id(db, relato_id)
+    relato = await relato_async_service.get_relato_by_id(db, relato_id)
     if not relato:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Relato não encontrado")
     return relato
 
 
 @router.put("/{relato_id}", response_model=Relato)
-async def update_relato(
+def update_relato(
         relato_id: int,
         relato_data: RelatoCreateDto,  # Reutilizando o DTO de criação para o PUT
         db: SessionDep,
@@ -100,7 +225,7 @@ async def update_relato(
 
 
 @router.delete("/{relato_id}", response_model=RelatoDeleteResponseDto)
-async def delete_relato(
+def delete_relato(
         relato_id: int,
         db: SessionDep,
         user: Usuario = Depends(get_current_user),
@@ -128,8 +253,19 @@ async def delete_relato(
     return RelatoDeleteResponseDto(success=True, message="Relato deletado com sucesso")
 
 
+def _batch_response(created_count: int, inicio: float) -> RelatoBatchResponseDto:
+    elapsed = time.perf_counter() - inicio
+    return RelatoBatchResponseDto(
+        success=True,
+        message=f"{created_count} relatos criados com sucesso.",
+        created_count=created_count,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(created_count / elapsed, 1) if elapsed > 0 else 0.0
+    )
+
+
 @router.post("/batch", response_model=RelatoBatchResponseDto, status_code=status.HTTP_201_CREATED)
-async def create_relatos_batch(
+def create_relatos_batch(
         relatos_data: list[RelatoCreateDto],
         db: SessionDep,
         admin_user: Usuario = Depends(get_current_admin_user)  # <-- Protegido por Admin
@@ -139,32 +275,64 @@ async def create_relatos_batch(
     Acessível apenas por administradores.
     Todos os relatos criados serão associados ao admin que fez o upload.
     """
+    inicio = time.perf_counter()
     created_count = relato_service.create_relatos_batch(
         relatos_data=relatos_data,
         admin_user=admin_user,
         db=db
     )
 
-    return RelatoBatchResponseDto(
-        success=True,
-        message=f"{created_count} relatos criados com sucesso.",
-        created_count=created_count
+    return _batch_response(created_count, inicio)
+
+
+@router.post("/batch/upload", response_model=RelatoBatchResponseDto, status_code=status.HTTP_201_CREATED)
+def upload_relatos_batch(
+        db: SessionDep,
+        file: UploadFile = File(..., description="Arquivo NDJSON (um relato por linha) ou CSV com cabeçalho"),
+        format: Optional[Literal["ndjson", "csv"]] = Query(
+            None, description="Formato do arquivo. Se omitido, é deduzido pela extensão (.csv ou não)."
+        ),
+        admin_user: Usuario = Depends(get_current_admin_user)  # <-- Protegido por Admin
+):
+    """
+    Importa relatos em massa a partir de um arquivo, sem carregar a lista inteira na memória:
+    cada linha é validada e enviada ao banco (COPY) enquanto o arquivo é lido.
+    Os campos são os mesmos do `POST /relato`. Se alguma linha for inválida,
+    nada é importado e o erro indica o número da linha.
+    Acessível apenas por administradores.
+    """
+    if format is None:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+
+    leitor = relato_import_service.iter_csv if format == "csv" else relato_import_service.iter_ndjson
+
+    inicio = time.perf_counter()
+    created_count = relato_service.create_relatos_batch(
+        relatos_data=leitor(file.file),
+        admin_user=admin_user,
+        db=db
     )
 
+    return _batch_response(created_count, inicio)
+
 
 
 # 1. Endpoint: Filtrar por Categoria
 @router.get("/categoria/{category_id}", response_model=list[RelatoRead])
 async def get_relatos_por_categoria(
     category_id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
+    response: Response,
     offset: int = 0,
-    limit: Annotated[int, Query(le=100)] = 100
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: CursorQuery = None
 ):
     """
     Retorna relatos filtrados por uma categoria específica.
     """
-    relatos = relato_service.get_relatos_by_category(db, category_id, offset, limit)
+    relatos = await relato_async_service.get_relatos_by_category(db, category_id, offset, limit, cursor)
+    relatos, next_cursor = relato_service.split_page(relatos, limit)
+    set_next_cursor(response, next_cursor)
     return relatos
 
 
@@ -172,25 +340,31 @@ async def get_relatos_por_categoria(
 @router.get("/usuario/{user_id}", response_model=list[RelatoRead])
 async def get_relatos_por_usuario(
     user_id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
+    response: Response,
     offset: int = 0,
-    limit: Annotated[int, Query(le=100)] = 100
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: CursorQuery = None
 ):
     """
     Retorna todos os relatos feitos por um usuário específico (pelo ID do usuário).
     """
-    relatos = relato_service.get_relatos_by_user_id(db, user_id, offset, limit)
+    relatos = await relato_async_service.get_relatos_by_user_id(db, user_id, offset, limit, cursor)
+    relatos, next_cursor = relato_service.split_page(relatos, limit)
+    set_next_cursor(response, next_cursor)
     return relatos
 
 
 # 3. Endpoint: Filtrar por Intervalo de Datas
 @router.get("/busca/periodo", response_model=list[RelatoRead])
 async def get_relatos_por_periodo(
-    db: SessionDep,
+    db: AsyncSessionDep,
+    response: Response,
     start_date: datetime = Query(..., description="Data inicial (ISO 8601), ex: 2025-01-01T00:00:00"),
     end_date: datetime = Query(..., description="Data final (ISO 8601), ex: 2025-01-31T23:59:59"),
     offset: int = 0,
-    limit: Annotated[int, Query(le=100)] = 100
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: CursorQuery = None
 ):
     """
     Retorna relatos ocorridos dentro de um intervalo de datas (baseado na data_furto).
@@ -201,31 +375,70 @@ async def get_relatos_por_periodo(
             detail="A data inicial não pode ser maior que a data final."
         )
 
-    relatos = relato_service.get_relatos_by_date_range(db, start_date, end_date, offset, limit)
+    relatos = await relato_async_service.get_relatos_by_date_range(db, start_date, end_date, offset, limit, cursor)
+    relatos, next_cursor = relato_service.split_page(relatos, limit)
+    set_next_cursor(response, next_cursor)
     return relatos
 
 
 @router.post("/{relato_id}/confirmar", status_code=status.HTTP_200_OK)
 async def confirmar_relato(
     relato_id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     user: Usuario = Depends(get_current_user)
 ):
     """
     Alterna (toggle) a confirmação de um relato.
     Funciona como um 'Upvote' ou 'Eu também vi'.
     """
-    return toggle_confirmacao(db, relato_id, user)
+    return await relato_async_service.toggle_confirmacao(db, relato_id, user)
 
 @router.get("/search/text", response_model=list[RelatoRead])
 async def buscar_relatos_texto(
-    q: str,
-    db: SessionDep,
+    db: AsyncSessionDep,
+    response: Response,
+    q: str = Query(..., min_length=1, description='Termos da busca. Aceita "frase exata", `or` e `-termo`.'),
     offset: int = 0,
-    limit: int = 100
+    limit: Annotated[int, Query(le=100)] = 20,
+    cursor: CursorQuery = None,
+    headline: bool = Query(False, description="Inclui um trecho da descrição com os termos destacados.")
 ):
     """
     Realiza uma busca textual (Full Text Search) nos relatos.
-    Procura no objeto roubado e descrição.
+    Procura no objeto roubado e descrição e ordena pela relevância (`rank`).
+    """
+    rows = await relato_async_service.search_relatos(db, q, offset, limit, cursor, headline)
+    rows, next_cursor = relato_service.split_search_page(rows, limit)
+    set_next_cursor(response, next_cursor)
+
+    return [
+        RelatoRead.model_validate(relato, update={"rank": rank, "headline": trecho})
+        for relato, rank, trecho in rows
+    ]
+
+
+@router.get("/search/suggest", response_model=list[RelatoSugestaoDto])
+async def sugerir_termos(
+    db: AsyncSessionDep,
+    q: str = Query(..., min_length=2, max_length=100, description='Texto parcial digitado, ex.: "celu".'),
+    campo: Optional[Literal["obj_roubado", "local"]] = Query(
+        None, description="Restringe as sugestões a uma coluna. Se omitido, sugere das duas."
+    ),
+    limit: Annotated[int, Query(ge=1, le=20)] = 8
+):
+    """
+    Autocomplete de objetos roubados e locais a partir de um texto parcial.
+    Retorna os termos distintos mais relevantes, com a similaridade e a quantidade de relatos.
+    Termos de relatos novos aparecem depois da próxima atualização das sugestões.
+    """
+    return await suggestion_service.get_suggestions(db, q, limit, campo)
+
+
+@router.post("/search/suggest/refresh")
+def atualizar_sugestoes(db: SessionDep, admin_user: Usuario = Depends(get_current_admin_user)):
+    """
+    Recalcula os termos usados pelo `/relato/search/suggest`.
+    **Requer permissão de Admin.**
     """
-    return search_relatos(db, q, offset, limit)
\ No newline at end of file
+    suggestion_service.refresh_suggestions(db)
+    return {"success": True}
@@ -1,15 +1,56 @@
-from fastapi import APIRouter
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
 from database import SessionDep
 import services.stats_service as stats_service
+from dtos.stats.stats_series_response import StatsSeriesResponse
 
 router = APIRouter(prefix="/stats", tags=["Estatísticas"])
 
 @router.get("/geral")
 def get_general_stats(db: SessionDep):
-    """Retorna contagem total de relatos e relatos nos últimos 30 dias."""
+    """
+    Retorna contagem total de relatos e relatos nos últimos 30 dias.
+    Os números são pré-calculados; `atualizado_em` indica quando foram atualizados.
+    """
     return stats_service.get_general_stats(db)
 
 @router.get("/categorias")
 def get_category_stats(db: SessionDep):
-    """Retorna a quantidade de crimes por categoria."""
-    return stats_service.get_stats_by_category(db)
\ No newline at end of file
+    """
+    Retorna a quantidade de crimes por categoria.
+    Os números são pré-calculados; `atualizado_em` indica quando foram atualizados.
+    """
+    return stats_service.get_stats_by_category(db)
+
+
+@router.get("/series", response_model=StatsSeriesResponse)
+def get_series_stats(
+        db: SessionDep,
+        bucket: Literal["day", "week", "month"] = Query("day", description="Tamanho de cada ponto da série."),
+        categoria_id: Optional[int] = Query(None, description="Filtra por categoria"),
+        start_date: Optional[datetime] = Query(None, description="Data inicial (ISO 8601) da data_furto"),
+        end_date: Optional[datetime] = Query(None, description="Data final (ISO 8601) da data_furto"),
+        min_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box: latitude mínima"),
+        min_lon: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box: longitude mínima"),
+        max_lat: Optional[float] = Query(None, ge=-90, le=90, description="Bounding box: latitude máxima"),
+        max_lon: Optional[float] = Query(None, ge=-180, le=180, description="Bounding box: longitude máxima"),
+):
+    """
+    Retorna a quantidade de relatos por dia, semana ou mês (da data do furto),
+    somente dos buckets que têm relatos. O período informado é arredondado para buckets inteiros.
+
+    Os buckets já fechados vêm de uma tabela pré-agregada (`source: "rollup"`) e só
+    o bucket atual é contado na hora. Com bounding box, tudo é contado na hora
+    (`source: "live"`).
+    """
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    usa_bbox = any(v is not None for v in bbox)
+    if usa_bbox and (None in bbox or min_lat > max_lat or min_lon > max_lon):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bounding box inválido: informe min_lat, min_lon, max_lat e max_lon, com os mínimos menores que os máximos."
+        )
+
+    return stats_service.get_series(db, bucket, categoria_id, start_date, end_date, bbox if usa_bbox else None)
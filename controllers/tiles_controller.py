@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response, status
+
+from database import SessionDep
+import services.tile_service as tile_service
+
+router = APIRouter(prefix="/tiles", tags=["Tiles"])
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@router.get(
+    "/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {MVT_MEDIA_TYPE: {}}}}
+)
+def get_relatos_tile(
+        z: int,
+        x: int,
+        y: int,
+        db: SessionDep,
+        categoria_id: Optional[int] = Query(None, description="Filtra por categoria"),
+        start_date: Optional[datetime] = Query(None, description="Data inicial (ISO 8601) da data_furto"),
+        end_date: Optional[datetime] = Query(None, description="Data final (ISO 8601) da data_furto"),
+):
+    """
+    Retorna um Mapbox Vector Tile (esquema XYZ) com os relatos do tile `z/x/y`.
+
+    Cada feição da camada `relatos` é um ponto com os atributos `id` e `categoria_id`.
+    Assim o mapa baixa só os tiles visíveis, em vez de todos os pontos.
+    """
+    if not 0 <= z <= tile_service.TILE_MAX_ZOOM or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Coordenadas de tile inválidas.")
+
+    tile = tile_service.get_tile(db, z, x, y, categoria_id, start_date, end_date)
+
+    return Response(
+        content=tile,
+        media_type=MVT_MEDIA_TYPE,
+        headers={"Cache-Control": "public, max-age=60"}
+    )
@@ -1,6 +1,12 @@
 import os
+import threading
+import time
 from fastapi.params import Depends
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Annotated
 from dotenv import load_dotenv
 
@@ -15,7 +21,166 @@ DB_DATABASE= os.getenv('DB_DATABASE')
 
 database_url = f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}"
 
-engine = create_engine(database_url, echo=True)
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Perfil do engine. Cada variável DB_* abaixo pode sobrescrever o padrão do perfil.
+# - development: loga todo o SQL e não limita a duração das consultas
+# - production: sem log de SQL e com timeouts de statement/transação ociosa
+APP_ENV = os.getenv("APP_ENV", "development")
+_PRODUCTION = APP_ENV == "production"
+
+DB_ECHO = _env_bool("DB_ECHO", not _PRODUCTION)
+# Cada engine tem o seu pool: DB_POOL_* para o síncrono (rotas `def`, autenticação)
+# e DB_ASYNC_POOL_* para o assíncrono (rotas `async def`). Os padrões somam as 15
+# conexões por worker que o engine único usava antes.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "2"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "3"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "3"))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "7"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# Em milissegundos; 0 desativa o limite
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000" if _PRODUCTION else "0"))
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(
+    os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", "60000" if _PRODUCTION else "0")
+)
+
+
+class PoolMetrics:
+    """Contadores de espera por conexão de um pool (checkouts que encontraram o pool esgotado)."""
+
+    def __init__(self):
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "waits": self.waits,
+                "wait_seconds_total": round(self.wait_seconds, 6),
+                "max_wait_seconds": round(self.max_wait_seconds, 6),
+                "timeouts": self.timeouts,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Mede os checkouts que precisam esperar porque todas as conexões (inclusive overflow) estão em uso."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        esgotado = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        if not esgotado:
+            return super()._do_get()
+
+        inicio = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - inicio, timed_out)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+def _connect_args() -> dict:
+    """Timeouts por sessão, passados ao Postgres na abertura de cada conexão."""
+    options = []
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        options.append(f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}")
+    if DB_IDLE_IN_TRANSACTION_TIMEOUT_MS > 0:
+        options.append(f"-c idle_in_transaction_session_timeout={DB_IDLE_IN_TRANSACTION_TIMEOUT_MS}")
+    return {"options": " ".join(options)} if options else {}
+
+
+_engine_kwargs = dict(
+    echo=DB_ECHO,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_connect_args(),
+)
+
+engine = create_engine(
+    database_url,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    **_engine_kwargs
+)
+
+# Engine assíncrono (driver async do psycopg) para os endpoints `async def`,
+# que assim não bloqueiam o event loop enquanto esperam o banco.
+async_engine = create_async_engine(
+    database_url,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=DB_ASYNC_POOL_SIZE,
+    max_overflow=DB_ASYNC_MAX_OVERFLOW,
+    **_engine_kwargs
+)
+
+
+def _pool_status(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **pool.metrics.snapshot(),
+    }
+
+
+def pool_status() -> dict:
+    """Estado atual dos pools (deste worker) e a configuração em uso."""
+    return {
+        "profile": APP_ENV,
+        "sync": _pool_status(engine.pool),
+        "async": _pool_status(async_engine.sync_engine.pool),
+        "config": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "async_pool_size": DB_ASYNC_POOL_SIZE,
+            "async_max_overflow": DB_ASYNC_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+            "idle_in_transaction_session_timeout_ms": DB_IDLE_IN_TRANSACTION_TIMEOUT_MS,
+            "echo": DB_ECHO,
+            # Cada worker pode abrir até isso de conexões (engine síncrono + assíncrono);
+            # multiplique pelo número de workers para comparar com o max_connections do Postgres.
+            "max_connections_per_worker": (
+                DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW
+            ),
+        },
+    }
 
 
 def get_session():
@@ -23,4 +188,12 @@ def get_session():
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_session)]
+
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
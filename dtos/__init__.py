@@ -5,4 +5,5 @@ from .relatos.relato_delete_response import RelatoDeleteResponseDto
 from .relatos.relato_batch_response import RelatoBatchResponseDto
 from .fotos.foto_relato_response import FotoRelatoResponseDto
 from .fotos.foto_relato_read import FotoRelatoRead
-from .relatos.relato_read import RelatoRead
\ No newline at end of file
+from .relatos.relato_read import RelatoRead
+from .fotos.foto_relato_batch_response import FotoRelatoBatchResponseDto, FotoUploadResultDto
\ No newline at end of file
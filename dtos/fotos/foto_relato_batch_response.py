@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+from .foto_relato_response import FotoRelatoResponseDto
+
+
+class FotoUploadResultDto(BaseModel):
+    filename: str | None
+    success: bool
+    foto: FotoRelatoResponseDto | None = None
+    status_code: int | None = None
+    detail: str | None = None
+
+
+class FotoRelatoBatchResponseDto(BaseModel):
+    relato_id: int
+    created_count: int
+    failed_count: int
+    results: list[FotoUploadResultDto]
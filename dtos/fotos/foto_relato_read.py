@@ -2,4 +2,5 @@ from pydantic import BaseModel
 
 class FotoRelatoRead(BaseModel):
     id: int
-    url: str
\ No newline at end of file
+    url: str
+    thumbnail_url: str | None = None
\ No newline at end of file
@@ -3,4 +3,5 @@ from pydantic import BaseModel
 class FotoRelatoResponseDto(BaseModel):
     id: int
     url: str
+    thumbnail_url: str | None = None
     relato_id: int
\ No newline at end of file
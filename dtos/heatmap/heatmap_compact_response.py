@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List
+from .heatmap_cicrle import HeatmapCircle
+
+
+class HeatmapColumnarPoints(BaseModel):
+    lat: List[float]
+    long: List[float]
+
+
+class HeatmapColumnarResponse(BaseModel):
+    circles: List[HeatmapCircle]
+    points: HeatmapColumnarPoints
+
+
+class HeatmapPolylineResponse(BaseModel):
+    circles: List[HeatmapCircle]
+    # Pontos no formato "Encoded Polyline" do Google, na precisão informada
+    points: str
+    precision: int
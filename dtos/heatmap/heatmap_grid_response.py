@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Literal
+
+
+class HeatmapGridCell(BaseModel):
+    # Centro da célula
+    latitude: float
+    longitude: float
+    count: int
+
+
+class HeatmapGridResponse(BaseModel):
+    zoom: int
+    cell_size_degrees: float
+    # "rollup" quando veio da tabela pré-agregada, "live" quando agregado na hora
+    source: Literal["rollup", "live"]
+    cells: List[HeatmapGridCell]
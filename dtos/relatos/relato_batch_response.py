@@ -4,4 +4,6 @@ from pydantic import BaseModel
 class RelatoBatchResponseDto(BaseModel):
     success: bool
     message: str
-    created_count: int
\ No newline at end of file
+    created_count: int
+    elapsed_seconds: float
+    rows_per_second: float
@@ -22,4 +22,11 @@ class RelatoRead(SQLModel):
     # Este campo irá conter a lista de URLs das fotos
     fotos: List[FotoRelatoRead] = []
 
-    numero_confirmacoes: int
\ No newline at end of file
+    numero_confirmacoes: int
+
+    # Preenchido apenas nas buscas por proximidade (/relato/nearby)
+    distance_m: float | None = None
+
+    # Preenchidos apenas na busca textual (/relato/search/text)
+    rank: float | None = None
+    headline: str | None = None
@@ -0,0 +1,13 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class RelatoSugestaoDto(BaseModel):
+    # Coluna de onde veio o termo
+    campo: Literal["obj_roubado", "local"]
+    termo: str
+    # word_similarity entre o texto digitado e o termo (0 a 1)
+    similaridade: float
+    # Quantidade de relatos com esse termo
+    quantidade: int
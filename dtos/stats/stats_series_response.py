@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import List, Literal
+
+from pydantic import BaseModel
+
+
+class StatsSeriesPoint(BaseModel):
+    # Início do bucket (dia, semana começando na segunda-feira ou mês)
+    bucket: datetime
+    quantidade: int
+
+
+class StatsSeriesResponse(BaseModel):
+    bucket: Literal["day", "week", "month"]
+    # "rollup" quando os buckets fechados vieram da view pré-agregada, "live" quando tudo foi agregado na hora
+    source: Literal["rollup", "live"]
+    pontos: List[StatsSeriesPoint]
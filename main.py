@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends, HTTPException, status
@@ -10,17 +11,39 @@ from controllers.heatmap_controller import router as heatmap_router
 from controllers.foto_relato_controller import router as foto_router
 from controllers.stats_controller import router as stats_router
 from controllers.location_controller import router as location_router
+from controllers.tiles_controller import router as tiles_router
+from controllers.admin_controller import router as admin_router
 from auth import auth
+from services.pagination_service import NEXT_CURSOR_HEADER
+import services.maintenance_service as maintenance_service
+import services.storage_service as storage_service
+import services.image_service as image_service
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("🚀 Aplicação iniciando... buscando cliente JWKS do Keycloak.")
-    auth.jwks_client = auth.get_jwks_client()
-    print("✅ Cliente JWKS pronto.")
+    print("🚀 Aplicação iniciando... carregando as chaves JWKS.")
+    await auth.init_jwks()
+
+    # Recarrega as chaves fora das requisições: periodicamente (rotação no Keycloak),
+    # em novas tentativas se a carga inicial falhou e quando chega um `kid` desconhecido
+    jwks_task = None
+    if not auth.AUTH_OFFLINE_PRIVATE_KEY_FILE:
+        jwks_task = asyncio.create_task(auth.run_jwks_refresh_loop())
+
+    # Atualização periódica das views materializadas (estatísticas e sugestões)
+    refresh_task = None
+    if maintenance_service.REFRESH_INTERVAL_SECONDS > 0:
+        refresh_task = asyncio.create_task(maintenance_service.run_refresh_loop())
 
     yield
 
+    if refresh_task:
+        refresh_task.cancel()
+    if jwks_task:
+        jwks_task.cancel()
+    await storage_service.close_client()
+    image_service.shutdown_executor()
     print("👋 Aplicação encerrada.")
 
 
@@ -46,7 +69,8 @@ app = FastAPI(title="Ari crimes API",
               servers=servers,
               lifespan=lifespan)
 
-app.add_middleware(CORSMiddleware, allow_origins=origins, allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(CORSMiddleware, allow_origins=origins, allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=[NEXT_CURSOR_HEADER])
 
 app.include_router(categoria_router)
 app.include_router(auth_router)
@@ -57,6 +81,8 @@ app.include_router(foto_router)
 app.include_router(stats_router)
 
 app.include_router(location_router)
+app.include_router(tiles_router)
+app.include_router(admin_router)
 
 
 @app.get(
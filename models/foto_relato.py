@@ -12,6 +12,8 @@ class FotoRelato(SQLModel, table=True):
 
     id: int | None = Field(default=None, primary_key=True)
     url: str
+    # Miniatura para listagens (NULL em fotos enviadas antes do processamento de imagens)
+    thumbnail_url: str | None = None
 
     relato_id: int = Field(foreign_key='relato.id')
 
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional  # <-- ADICIONE
 
-from sqlalchemy import Column
+from sqlalchemy import Column, Computed
 from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from .base import SQLModel, Field
@@ -22,11 +22,18 @@ class Relato(SQLModel, table=True):
     data_furto: datetime
     data_registro: datetime
 
-    # Novo campo para busca textual (nullable para não quebrar registros)
-    # Usamos sa_column para definir tipos específicos do Postgres
+    # Vetor da busca textual, coluna gerada (STORED) pelo Postgres a partir de
+    # obj_roubado e descricao. Nunca é escrito pela aplicação.
     search_vector: Optional[str] = Field(
         default=None,
-        sa_column=Column(TSVECTOR, nullable=True)
+        sa_column=Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector('portuguese'::regconfig, coalesce(obj_roubado, '') || ' ' || coalesce(descricao, ''))",
+                persisted=True
+            ),
+            nullable=True
+        )
     )
 
     usuario_id: int = Field(foreign_key='usuario.id')
@@ -37,11 +44,9 @@ class Relato(SQLModel, table=True):
 
     confirmacoes: List["ConfirmacaoRelato"] = Relationship()
 
-    # 2. Crie a propriedade computada
-    @property
-    def numero_confirmacoes(self) -> int:
-        """Retorna a contagem de confirmações (likes) deste relato."""
-        return len(self.confirmacoes)
+    # Contador de confirmações (likes) mantido pelo toggle_confirmacao.
+    # Evita carregar todas as linhas de confirmacao_relato só para contá-las.
+    numero_confirmacoes: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
 
 
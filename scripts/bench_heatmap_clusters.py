@@ -0,0 +1,91 @@
+"""
+Benchmark do pós-processamento dos clusters do mapa de calor.
+
+Compara o laço original (máscara por cluster + haversine ponto a ponto) com o
+`summarize_clusters` vetorizado, usando pontos sintéticos já rotulados.
+O DBSCAN em si não é medido, só o cálculo de centro, peso e raio.
+
+Uso (a partir da raiz do projeto):
+    python -m scripts.bench_heatmap_clusters --points 1000000 --clusters 5000
+"""
+import argparse
+import time
+
+import numpy as np
+from haversine import haversine, Unit
+
+from services.heatmap_service import summarize_clusters
+
+
+def gerar_pontos(n_points: int, n_clusters: int, seed: int = 42) -> tuple[np.ndarray, np.ndarray]:
+    """Gera pontos ao redor de centros aleatórios em Rondônia, com ~10% de ruído (label -1)."""
+    rng = np.random.default_rng(seed)
+    centros = np.column_stack((
+        rng.uniform(-13.5, -8.0, n_clusters),
+        rng.uniform(-66.0, -60.0, n_clusters),
+    ))
+    labels = rng.integers(0, n_clusters, n_points)
+    coords = centros[labels] + rng.normal(scale=0.002, size=(n_points, 2))
+    labels[rng.random(n_points) < 0.1] = -1
+    return coords, labels
+
+
+def laco_original(coords: np.ndarray, labels: np.ndarray) -> list[tuple[float, float, float, int]]:
+    """Reprodução do pós-processamento anterior do heatmap_controller."""
+    resultado = []
+    for label in set(labels):
+        if label == -1:
+            continue
+
+        cluster_points_coords = coords[labels == label]
+        weight = len(cluster_points_coords)
+        center = cluster_points_coords.mean(axis=0)
+        center_tuple = (center[0], center[1])
+
+        max_radius_meters = 0
+        for point in cluster_points_coords:
+            distance = haversine(center_tuple, (point[0], point[1]), unit=Unit.METERS)
+            if distance > max_radius_meters:
+                max_radius_meters = distance
+
+        resultado.append((center[0], center[1], max_radius_meters, weight))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--clusters", type=int, default=5_000)
+    parser.add_argument("--skip-original", action="store_true", help="Não executa o laço original (lento).")
+    args = parser.parse_args()
+
+    coords, labels = gerar_pontos(args.points, args.clusters)
+    print(f"{args.points} pontos, {args.clusters} clusters")
+
+    inicio = time.perf_counter()
+    circulos = summarize_clusters(coords, labels)
+    tempo_vetorizado = time.perf_counter() - inicio
+    print(f"vetorizado: {tempo_vetorizado:.3f}s ({len(circulos)} clusters)")
+
+    if args.skip_original:
+        return
+
+    inicio = time.perf_counter()
+    esperado = laco_original(coords, labels)
+    tempo_original = time.perf_counter() - inicio
+    print(f"original:   {tempo_original:.3f}s ({len(esperado)} clusters)")
+    print(f"speed-up:   {tempo_original / tempo_vetorizado:.1f}x")
+
+    # Confere que os dois caminhos produzem o mesmo resultado
+    esperado.sort(key=lambda c: (c[0], c[1]))
+    obtido = sorted(
+        ((c.latitude, c.longitude, c.radius_meters, c.weight) for c in circulos),
+        key=lambda c: (c[0], c[1])
+    )
+    assert len(esperado) == len(obtido)
+    assert np.allclose(np.array(esperado), np.array(obtido), rtol=1e-6, atol=1e-6)
+    print("resultados equivalentes")
+
+
+if __name__ == "__main__":
+    main()
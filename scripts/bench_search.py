@@ -0,0 +1,131 @@
+"""
+Benchmark da busca textual (/relato/search/text) no banco configurado no .env.
+
+Compara a consulta antiga (plainto_tsquery, sem ordenação, paginação por offset)
+com a nova (websearch_to_tsquery + ts_rank_cd, paginação por cursor) e mostra o
+plano (EXPLAIN ANALYZE) da nova, para conferir o uso do índice GIN ix_relato_search_vector.
+
+O rank exige ler o search_vector de todas as linhas que casam com a busca, então o
+custo da nova consulta cresce com o número de resultados (termos muito comuns),
+enquanto a antiga para assim que encontra as primeiras `limit` linhas.
+
+Com --seed, antes insere N relatos sintéticos via COPY, associados ao primeiro
+usuário e à primeira categoria do banco. Use apenas em um banco de testes.
+
+Uso (a partir da raiz do projeto):
+    python -m scripts.bench_search --seed 1000000 --query "celular preto"
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select, text
+
+from database import engine
+from dtos import RelatoCreateDto
+from models import Categoria, Usuario
+import services.relato_import_service as relato_import_service
+import services.relato_service as relato_service
+
+PALAVRAS = [
+    "celular", "bicicleta", "carteira", "moto", "carro", "notebook", "bolsa", "mochila",
+    "documentos", "relógio", "preto", "azul", "branco", "prata", "noite", "madrugada",
+    "praça", "centro", "ônibus", "parada", "assalto", "arma", "faca", "dois", "homens",
+    "fugiram", "levaram", "furtado", "estacionado", "janela", "quebrada", "feira",
+]
+
+
+def gerar_relatos(n: int, categoria_id: int, seed: int = 42):
+    rng = random.Random(seed)
+    inicio = datetime(2020, 1, 1)
+    for _ in range(n):
+        data = inicio + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5))
+        yield RelatoCreateDto(
+            obj_roubado=rng.choice(PALAVRAS[:10]),
+            descricao=" ".join(rng.choices(PALAVRAS, k=rng.randint(8, 30))),
+            local="Centro",
+            latitude=rng.uniform(-13.5, -8.0),
+            longitude=rng.uniform(-66.0, -60.0),
+            data_furto=data.isoformat(),
+            data_registro=data.isoformat(),
+            categoria_id=categoria_id,
+        )
+
+
+def medir(nome: str, executar, repeticoes: int) -> None:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        linhas = executar()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"{nome:<34} mediana {statistics.median(tempos):8.2f} ms  (linhas: {linhas})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="Insere N relatos sintéticos antes de medir.")
+    parser.add_argument("--query", default="celular preto")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10, help="Páginas percorridas no teste de paginação.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with Session(engine) as db:
+        if args.seed:
+            usuario = db.exec(select(Usuario).order_by(Usuario.id)).first()
+            categoria = db.exec(select(Categoria).order_by(Categoria.id)).first()
+            inicio = time.perf_counter()
+            criados = relato_import_service.copy_relatos(db, gerar_relatos(args.seed, categoria.id), usuario.id)
+            db.commit()
+            db.exec(text("ANALYZE relato"))
+            db.commit()
+            print(f"{criados} relatos inseridos em {time.perf_counter() - inicio:.1f}s")
+
+        total = db.exec(text("SELECT count(*) FROM relato")).scalar()
+        print(f"{total} relatos na tabela, busca: {args.query!r}, limit {args.limit}\n")
+
+        def antiga(offset: int = 0):
+            return len(db.exec(
+                text("""
+                    SELECT id FROM relato
+                    WHERE search_vector @@ plainto_tsquery('portuguese', :q)
+                    OFFSET :offset LIMIT :limit
+                """),
+                params={"q": args.query, "offset": offset, "limit": args.limit}
+            ).all())
+
+        def nova(cursor: str | None = None):
+            return relato_service.search_relatos(db, args.query, 0, args.limit, cursor)
+
+        def paginar_offset():
+            return sum(antiga(pagina * args.limit) for pagina in range(args.pages))
+
+        def paginar_cursor():
+            cursor, linhas = None, 0
+            for _ in range(args.pages):
+                rows, cursor = relato_service.split_search_page(nova(cursor), args.limit)
+                linhas += len(rows)
+                if not cursor:
+                    break
+            return linhas
+
+        medir("antiga (sem rank)", antiga, args.repeat)
+        medir("nova (ts_rank_cd)", lambda: len(nova()), args.repeat)
+        medir("nova + ts_headline", lambda: len(
+            relato_service.search_relatos(db, args.query, 0, args.limit, headline=True)
+        ), args.repeat)
+        medir(f"antiga, {args.pages} páginas (offset)", paginar_offset, args.repeat)
+        medir(f"nova, {args.pages} páginas (cursor)", paginar_cursor, args.repeat)
+
+        compilada = relato_service.search_relatos_query(args.query, 0, args.limit).compile(
+            dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+        print("\nEXPLAIN ANALYZE da nova consulta:")
+        for (linha,) in db.exec(text(f"EXPLAIN (ANALYZE, BUFFERS) {compilada}")).all():
+            print(f"  {linha}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Confere, via EXPLAIN, que cada combinação de filtros do /relato/query tem um
+caminho por índice, ou seja, que nenhuma delas faz Seq Scan em `relato`.
+
+Por padrão roda com `enable_seqscan = off`: assim o planejador só escolhe Seq Scan
+quando não existe índice que atenda a consulta, e o resultado não depende do volume
+de dados do banco. Com --planner-default, usa as escolhas normais do planejador
+(útil em um banco com volume e estatísticas de produção).
+
+Sai com código 1 se alguma combinação não usar índice, e com código 2 (sem rodar
+nenhuma combinação) se o banco não tiver a extensão PostGIS ou os índices usados
+pelos filtros de área: sem eles as combinações bbox/raio não podem ser conferidas.
+
+Uso (a partir da raiz do projeto, com o banco do .env já migrado):
+    python -m scripts.explain_relato_query
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from sqlmodel import Session, text
+
+from database import engine
+import services.relato_service as relato_service
+from services.pagination_service import encode_cursor
+
+PERIODO = {"start_date": datetime(2024, 1, 1), "end_date": datetime(2024, 3, 31)}
+BBOX = {"bbox": (-8.80, -63.95, -8.70, -63.85)}
+RAIO = {"center": (-8.76, -63.90), "radius_km": 2.0}
+TEXTO = {"query_text": "celular preto"}
+
+COMBINACOES = {
+    "sem filtros": {},
+    "categoria": {"category_id": 1},
+    "usuario": {"user_id": 1},
+    "periodo": PERIODO,
+    "bbox": BBOX,
+    "raio": RAIO,
+    "texto": TEXTO,
+    "categoria + periodo": {"category_id": 1, **PERIODO},
+    "usuario + periodo": {"user_id": 1, **PERIODO},
+    "categoria + bbox": {"category_id": 1, **BBOX},
+    "categoria + raio + periodo": {"category_id": 1, **RAIO, **PERIODO},
+    "texto + categoria": {"category_id": 1, **TEXTO},
+    "texto + raio": {**TEXTO, **RAIO},
+    "todos (bbox)": {"category_id": 1, "user_id": 1, **PERIODO, **BBOX, **TEXTO},
+}
+
+
+# Índices que as combinações de área e texto precisam encontrar no banco
+INDICES_ESPERADOS = (
+    "ix_relato_localizacao_geog_gist",
+    "ix_relato_localizacao_geom_gist",
+    "ix_relato_search_vector",
+)
+
+
+def conferir_banco(db: Session) -> list[str]:
+    """Retorna o que falta no banco para o EXPLAIN ser confiável (vazio se nada falta)."""
+    faltando = []
+    if db.exec(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() is None:
+        faltando.append("extensão postgis")
+
+    existentes = set(db.exec(text("SELECT indexname FROM pg_indexes WHERE tablename = 'relato'")).scalars())
+    faltando.extend(f"índice {nome}" for nome in INDICES_ESPERADOS if nome not in existentes)
+    return faltando
+
+
+def nos_do_plano(plano: dict):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from nos_do_plano(filho)
+
+
+def explicar(db: Session, filtros: dict, cursor: str | None) -> list[str]:
+    """Retorna os tipos de acesso à tabela relato usados no plano da consulta."""
+    compilada = relato_service.relatos_query(50, cursor, **filtros).compile(dialect=engine.dialect)
+    resultado = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compilada}", compilada.params
+    ).scalar()
+
+    return [
+        f"{no['Node Type']}" + (f" ({no['Index Name']})" if "Index Name" in no else "")
+        for no in nos_do_plano(resultado[0]["Plan"])
+        if no.get("Relation Name") == "relato" or no["Node Type"].startswith("Bitmap Index")
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--planner-default", action="store_true", help="Não desliga o enable_seqscan.")
+    args = parser.parse_args()
+
+    cursor = encode_cursor(datetime(2024, 2, 15), 1000)
+    falhas = 0
+
+    with Session(engine) as db:
+        faltando = conferir_banco(db)
+        if faltando:
+            print(f"Banco sem {', '.join(faltando)}: rode as migrações em um Postgres com PostGIS.")
+            sys.exit(2)
+
+        if not args.planner_default:
+            db.exec(text("SET enable_seqscan = off"))
+
+        for nome, filtros in COMBINACOES.items():
+            for com_cursor in (False, True):
+                acessos = explicar(db, filtros, cursor if com_cursor else None)
+                ok = bool(acessos) and not any(acesso.startswith("Seq Scan") for acesso in acessos)
+                falhas += not ok
+
+                rotulo = f"{nome}{' + cursor' if com_cursor else ''}"
+                print(f"[{'ok' if ok else 'FALHA'}] {rotulo:<36} {', '.join(acessos)}")
+
+    if falhas:
+        print(f"\n{falhas} combinação(ões) sem índice")
+        sys.exit(1)
+
+    print("\ntodas as combinações usam índice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Servidor de ficheiros local, substituto do file-server (Node) para desenvolvimento e testes.
+
+Implementa o mesmo contrato usado pelo storage_service:
+- POST /upload, multipart com o campo `file` e o header `x-upload-secret`,
+  responde {"url": "http://.../files/<nome>"};
+- GET /files/<nome> devolve o arquivo salvo.
+
+Opções para exercitar timeouts e novas tentativas: --delay (segundos antes de
+responder) e --fail-rate (fração de uploads respondidos com 503).
+
+Uso (a partir da raiz do projeto):
+    python -m scripts.fake_file_server --port 9000 --secret teste
+    FILE_SERVER_UPLOAD_URL=http://localhost:9000/upload FILE_SERVER_SECRET=teste uvicorn main:app
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, File, Header, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse
+
+
+def create_app(secret: str, storage_dir: str, delay: float = 0.0, fail_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake file server")
+
+    @app.post("/upload")
+    async def upload(
+            request: Request,
+            file: UploadFile = File(...),
+            x_upload_secret: str | None = Header(None)
+    ):
+        if x_upload_secret != secret:
+            raise HTTPException(status_code=401, detail="Secret inválido")
+
+        if delay:
+            await asyncio.sleep(delay)
+        if fail_rate and random.random() < fail_rate:
+            raise HTTPException(status_code=503, detail="Falha simulada")
+
+        extensao = os.path.splitext(file.filename or "")[1]
+        nome = f"{uuid.uuid4().hex}{extensao}"
+        with open(os.path.join(storage_dir, nome), "wb") as destino:
+            shutil.copyfileobj(file.file, destino)
+
+        return {"url": str(request.url_for("get_file", name=nome))}
+
+    @app.get("/files/{name}", name="get_file")
+    async def get_file(name: str):
+        caminho = os.path.join(storage_dir, os.path.basename(name))
+        if not os.path.isfile(caminho):
+            raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+        return FileResponse(caminho)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--secret", default=os.getenv("FILE_SERVER_SECRET", "teste"))
+    parser.add_argument("--dir", default=None, help="Pasta onde os arquivos são salvos (padrão: temporária).")
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    storage_dir = args.dir or tempfile.mkdtemp(prefix="fake_file_server_")
+    os.makedirs(storage_dir, exist_ok=True)
+    print(f"salvando arquivos em {storage_dir}")
+
+    uvicorn.run(create_app(args.secret, storage_dir, args.delay, args.fail_rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
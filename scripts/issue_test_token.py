@@ -0,0 +1,75 @@
+"""
+Emite tokens JWT para o modo offline da autenticação (AUTH_OFFLINE_PRIVATE_KEY_FILE),
+assinados com um par de chaves local, com o mesmo issuer/audience do Keycloak.
+Permite rodar a API e testes de carga sem acesso ao Keycloak.
+
+Uso (a partir da raiz do projeto):
+    python -m scripts.issue_test_token --generate-key offline_key.pem
+    AUTH_OFFLINE_PRIVATE_KEY_FILE=offline_key.pem uvicorn main:app
+    python -m scripts.issue_test_token --key offline_key.pem --sub user-1 --admin
+"""
+import argparse
+import time
+import uuid
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from auth.auth import KEYCLOAK_CLIENT_ID, KEYCLOAK_REALM, KEYCLOAK_SERVER_URL, OFFLINE_KID
+
+
+def gerar_chave(caminho: str) -> None:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    with open(caminho, "wb") as f:
+        f.write(pem)
+    print(f"chave privada gravada em {caminho}")
+
+
+def emitir_token(caminho_chave: str, sub: str, nome: str, email: str, admin: bool, minutos: int) -> str:
+    with open(caminho_chave, "rb") as f:
+        private_key = serialization.load_pem_private_key(f.read(), password=None)
+
+    agora = int(time.time())
+    payload = {
+        "iss": f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}",
+        "aud": KEYCLOAK_CLIENT_ID,
+        "sub": sub,
+        "name": nome,
+        "email": email,
+        "iat": agora,
+        "exp": agora + minutos * 60,
+        "jti": str(uuid.uuid4()),
+        "realm_access": {"roles": ["admin"] if admin else []},
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": OFFLINE_KID})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generate-key", metavar="ARQUIVO", help="Gera um novo par de chaves RSA e sai.")
+    parser.add_argument("--key", metavar="ARQUIVO", help="Chave privada usada para assinar.")
+    parser.add_argument("--sub", default="offline-user")
+    parser.add_argument("--name", default="Usuário Offline")
+    parser.add_argument("--email", default="offline@example.com")
+    parser.add_argument("--admin", action="store_true", help="Inclui a role 'admin'.")
+    parser.add_argument("--minutes", type=int, default=60, help="Validade do token.")
+    args = parser.parse_args()
+
+    if args.generate_key:
+        gerar_chave(args.generate_key)
+        return
+
+    if not args.key:
+        parser.error("informe --key (ou --generate-key)")
+
+    print(emitir_token(args.key, args.sub, args.name, args.email, args.admin, args.minutes))
+
+
+if __name__ == "__main__":
+    main()
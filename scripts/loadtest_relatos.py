@@ -0,0 +1,70 @@
+"""
+Teste de carga simples para os endpoints de leitura de relatos.
+
+Mantém `--concurrency` requisições simultâneas contra o endpoint durante
+`--duration` segundos e mostra a vazão (req/s) e as latências p50/p95/p99.
+Rode contra a API antes e depois de uma mudança (com o mesmo número de workers)
+para comparar, por exemplo, a sessão síncrona com a assíncrona.
+
+Uso (a partir da raiz do projeto, com a API no ar):
+    python -m scripts.loadtest_relatos --url http://localhost:8000/relato/latest?limit=20 \
+        --concurrency 64 --duration 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, url: str, headers: dict, deadline: float,
+                 latencies: list[float], erros: list[int]):
+    while time.perf_counter() < deadline:
+        inicio = time.perf_counter()
+        try:
+            response = await client.get(url, headers=headers)
+            if response.status_code >= 400:
+                erros.append(response.status_code)
+                continue
+        except httpx.HTTPError:
+            erros.append(0)
+            continue
+        latencies.append(time.perf_counter() - inicio)
+
+
+async def run(url: str, concurrency: int, duration: float, token: str | None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencies: list[float] = []
+    erros: list[int] = []
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            worker(client, url, headers, deadline, latencies, erros) for _ in range(concurrency)
+        ))
+
+    total = len(latencies)
+    print(f"{url} | concorrência {concurrency} | {duration:.0f}s")
+    print(f"requisições ok: {total} | erros: {len(erros)}")
+    print(f"vazão: {total / duration:.1f} req/s")
+    if total:
+        quantis = statistics.quantiles(latencies, n=100)
+        print(f"latência p50: {quantis[49] * 1000:.1f} ms | "
+              f"p95: {quantis[94] * 1000:.1f} ms | p99: {quantis[98] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/relato/latest?limit=20")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--token", default=None, help="Bearer token para endpoints autenticados.")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.concurrency, args.duration, args.token))
+
+
+if __name__ == "__main__":
+    main()
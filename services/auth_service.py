@@ -1,12 +1,27 @@
+import os
+
 from fastapi import Depends, HTTPException, status
 from models import Usuario
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from auth import validate_jwt
 from database import SessionDep
-from sqlmodel import select
+from sqlalchemy import or_, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from services.cache_service import LRUCache
 
 oauth2_scheme = HTTPBearer()
 
+# Campos do Usuario por keycloak_id, para não consultar o banco em toda requisição
+# autenticada. O login_or_register atualiza a entrada quando o perfil muda, mas só
+# no cache do worker que atendeu o login: os demais workers do uvicorn continuam
+# com os dados antigos até a entrada expirar. USER_CACHE_TTL é, portanto, o atraso
+# máximo para uma mudança de perfil (nome, e-mail, is_admin) valer em todos os workers.
+USER_CACHE = LRUCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL", "60"))
+)
+
 REALM_ROLES_PATH = ["realm_access", "roles"]
 
 
@@ -84,28 +99,70 @@ def login_or_register(
     if 'picture' in token:
         picture = token['picture']
 
-    statement = select(Usuario).where(Usuario.keycloak_id == uid)
-    db_user = session.exec(statement).first()
-
-    if not db_user:
-        # cria o usuario na base
-        new_user = Usuario(
-            nome=nome,
-            email=email,
-            keycloak_id=uid,
-            profile_pic_url=picture
+    # Um único statement: cria o usuário ou atualiza os dados vindos do token, mas só
+    # escreve se algum campo mudou. Sem mudança, o UPDATE não acontece, o RETURNING
+    # volta vazio e a linha atual vem do SELECT do UNION ALL.
+    # O ON CONFLICT também resolve dois primeiros logins simultâneos do mesmo usuário.
+    excluded = insert(Usuario).excluded
+    upsert = (
+        insert(Usuario)
+        .values(nome=nome, email=email, keycloak_id=uid, profile_pic_url=picture)
+        .on_conflict_do_update(
+            index_elements=[Usuario.keycloak_id],
+            set_={
+                "nome": excluded.nome,
+                "email": excluded.email,
+                "profile_pic_url": excluded.profile_pic_url,
+            },
+            where=or_(
+                Usuario.nome.is_distinct_from(excluded.nome),
+                Usuario.email.is_distinct_from(excluded.email),
+                Usuario.profile_pic_url.is_distinct_from(excluded.profile_pic_url),
+            )
         )
-        session.add(new_user)
-        session.commit()
-        session.refresh(new_user)
-        return new_user
-
-    db_user.nome = nome
-    db_user.email = email
-    db_user.profile_pic_url = picture
+        .returning(*Usuario.__table__.c)
+        .cte("upsert")
+    )
+    statement = union_all(
+        select(*upsert.c),
+        select(*Usuario.__table__.c).where(
+            Usuario.keycloak_id == uid,
+            ~select(upsert.c.id).exists()
+        )
+    )
 
+    row = session.exec(statement).first()
+    if row is None:
+        # Outra transação inseriu o usuário durante este statement (o ON CONFLICT
+        # esperou por ela), então a linha não era visível no SELECT acima
+        row = session.exec(select(*Usuario.__table__.c).where(Usuario.keycloak_id == uid)).first()
     session.commit()
-    session.refresh(db_user)
+
+    db_user = Usuario(**row._mapping)
+    USER_CACHE.set(uid, db_user.model_dump())
+
+    return db_user
+
+
+def _get_user_by_keycloak_id(session: Session, keycloak_id: str) -> Usuario | None:
+    """
+    Busca o usuário pelo keycloak_id, passando antes pelo USER_CACHE.
+
+    Em um acerto, retorna um Usuario transiente, montado a partir dos campos em
+    cache e não ligado a nenhuma sessão: nada é carregado sob demanda (atributos
+    adiados ou relacionamentos que venham a ser adicionados ao modelo) e o objeto
+    não deve ser passado a `session.add`, que tentaria inseri-lo como um usuário novo. Quem precisar da linha do banco deve buscá-la pelo `id`.
+    Os campos podem estar defasados em até USER_CACHE_TTL (ver USER_CACHE).
+    """
+    fields = USER_CACHE.get(keycloak_id)
+    if fields is not None:
+        return Usuario(**fields)
+
+    statement = select(Usuario).where(Usuario.keycloak_id == keycloak_id)
+    db_user = session.exec(statement).first()
+
+    if db_user:
+        USER_CACHE.set(keycloak_id, db_user.model_dump())
 
     return db_user
 
@@ -118,8 +175,7 @@ def get_current_user(
 
     uid = token['sub']
 
-    statement = select(Usuario).where(Usuario.keycloak_id == uid)
-    db_user = session.exec(statement).first()
+    db_user = _get_user_by_keycloak_id(session, uid)
 
     if not db_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Usuário não autenticado')
@@ -143,8 +199,7 @@ def get_current_admin_user(
 
     uid = token['sub']
 
-    statement = select(Usuario).where(Usuario.keycloak_id == uid)
-    db_user = session.exec(statement).first()
+    db_user = _get_user_by_keycloak_id(session, uid)
 
     if not db_user:
         # Se um token válido e admin não tiver usuário no DB
@@ -1,14 +1,16 @@
-from sqlmodel import Session
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models import FotoRelato, Relato
+from services.storage_service import StoredImage
 from fastapi import HTTPException, status
 
 
-def check_relato_ownership(db: Session, relato_id: int, user_id: int) -> Relato:
+async def check_relato_ownership(db: AsyncSession, relato_id: int, user_id: int) -> Relato:
     """
     Verifica se um relato existe e se o utilizador é o dono.
     Retorna o objeto Relato se for bem-sucedido, ou lança exceção.
     """
-    db_relato = db.get(Relato, relato_id)
+    db_relato = await db.get(Relato, relato_id)
     if not db_relato:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -24,21 +26,51 @@ def check_relato_ownership(db: Session, relato_id: int, user_id: int) -> Relato:
     return db_relato
 
 
-def create_foto_relato_db(db: Session, url: str, relato: Relato) -> FotoRelato:
+async def create_foto_relato_db(db: AsyncSession, url: str, thumbnail_url: str | None, relato: Relato) -> FotoRelato:
     """
     Salva a referência da URL da foto no banco de dados.
     Assume que a verificação de propriedade já foi feita.
     """
     try:
         # Usa o __tablename__ 'fotorelato'
-        db_foto = FotoRelato(url=url, relato_id=relato.id)
+        db_foto = FotoRelato(url=url, thumbnail_url=thumbnail_url, relato_id=relato.id)
         db.add(db_foto)
-        db.commit()
-        db.refresh(db_foto)
+        await db.commit()
+        await db.refresh(db_foto)
         return db_foto
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao salvar referência da foto no banco de dados: {e}"
-        )
\ No newline at end of file
+        )
+
+
+async def create_fotos_relato_db(db: AsyncSession, imagens: list[StoredImage], relato: Relato) -> list[FotoRelato]:
+    """
+    Salva as URLs de várias fotos de um relato em um único INSERT ... RETURNING.
+    Retorna as fotos na mesma ordem de `imagens`.
+    Assume que a verificação de propriedade já foi feita.
+    """
+    try:
+        # sort_by_parameter_order: o SQLAlchemy garante que as linhas do RETURNING
+        # venham na ordem dos parâmetros (o Postgres não garante isso no VALUES múltiplo)
+        resultado = await db.execute(
+            insert(FotoRelato).returning(
+                FotoRelato.id, FotoRelato.url, FotoRelato.thumbnail_url, FotoRelato.relato_id,
+                sort_by_parameter_order=True
+            ),
+            [
+                {"url": imagem.url, "thumbnail_url": imagem.thumbnail_url, "relato_id": relato.id}
+                for imagem in imagens
+            ]
+        )
+        fotos = [FotoRelato(**linha) for linha in resultado.mappings().all()]
+        await db.commit()
+        return fotos
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao salvar referências das fotos no banco de dados: {e}"
+        )
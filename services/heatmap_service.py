@@ -0,0 +1,446 @@
+import itertools
+import math
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import psycopg
+from fastapi import HTTPException, status
+from haversine import haversine_vector, Unit
+from sklearn.cluster import DBSCAN
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, select, text
+
+from dtos.heatmap.heatmap_cicrle import HeatmapCircle
+from dtos.heatmap.heatmap_grid_response import HeatmapGridCell, HeatmapGridResponse
+from models import Relato
+
+# Quantidade de linhas lidas do cursor do banco por vez
+HEATMAP_CHUNK_SIZE = 50_000
+
+EARTH_RADIUS_KM = 6371.0
+
+# Células da grade por lado de um tile (256px / 8 = células de 32px)
+GRID_CELLS_PER_TILE = 8
+
+# Maior zoom atendido pela tabela pré-agregada relato_grid_rollup
+GRID_ROLLUP_MAX_ZOOM = 6
+
+
+def load_coordinates(
+        db: Session,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        chunk_size: int = HEATMAP_CHUNK_SIZE
+) -> np.ndarray:
+    """
+    Carrega apenas (latitude, longitude) dos relatos em um array float64 de formato (n, 2).
+
+    Não hidrata objetos Relato: a consulta projeta só as duas colunas e é lida
+    em blocos por um cursor do lado do servidor (yield_per), e cada bloco
+    é copiado direto para um array NumPy.
+    """
+    query = select(Relato.latitude, Relato.longitude)
+    if start_date:
+        query = query.where(Relato.data_furto >= start_date)
+    if end_date:
+        query = query.where(Relato.data_furto <= end_date)
+
+    result = db.exec(query.execution_options(yield_per=chunk_size))
+
+    chunks: list[np.ndarray] = []
+    for partition in result.partitions():
+        flat = np.fromiter(
+            itertools.chain.from_iterable(partition),
+            dtype=np.float64,
+            count=2 * len(partition)
+        )
+        chunks.append(flat.reshape(-1, 2))
+
+    if not chunks:
+        return np.empty((0, 2), dtype=np.float64)
+
+    return np.concatenate(chunks)
+
+
+def cluster_with_sklearn(coords: np.ndarray, eps_km: float, min_samples: int) -> list[HeatmapCircle]:
+    """
+    Agrupa as coordenadas com o DBSCAN do scikit-learn (métrica haversine)
+    e devolve um círculo por cluster encontrado.
+    """
+    if len(coords) < min_samples:
+        # Não há dados suficientes para clusterizar
+        return []
+
+    # DBSCAN usa a métrica 'haversine' que espera coordenadas em radianos
+    coords_radians = np.radians(coords)
+
+    # Converte o 'eps' (raio de busca) de Km para radianos
+    eps_rad = eps_km / EARTH_RADIUS_KM
+
+    # Roda o algoritmo
+    db = DBSCAN(eps=eps_rad, min_samples=min_samples, metric='haversine').fit(coords_radians)
+
+    return summarize_clusters(coords, db.labels_)
+
+
+def summarize_clusters(coords: np.ndarray, labels: np.ndarray) -> list[HeatmapCircle]:
+    """
+    Resume os clusters do DBSCAN em círculos (centro, raio máximo e peso).
+
+    Tudo é feito com operações vetorizadas: pesos e centros saem de np.bincount
+    sobre os rótulos, as distâncias de cada ponto ao centro do seu cluster são
+    calculadas de uma vez com haversine_vector, e o raio máximo por cluster é
+    acumulado com np.maximum.at. O custo é O(n), independente do número de clusters.
+    """
+    # label -1 é "ruído" (pontos que não pertencem a nenhum cluster)
+    in_cluster = labels >= 0
+    if not in_cluster.any():
+        return []
+
+    cluster_coords = coords[in_cluster]
+    cluster_labels = labels[in_cluster]
+    n_clusters = int(cluster_labels.max()) + 1
+
+    # Peso (quantos pontos tem no cluster) e centro (média das latitudes e longitudes)
+    weights = np.bincount(cluster_labels, minlength=n_clusters)
+    non_empty = weights > 0
+    safe_weights = np.where(non_empty, weights, 1)
+    centers = np.column_stack((
+        np.bincount(cluster_labels, weights=cluster_coords[:, 0], minlength=n_clusters) / safe_weights,
+        np.bincount(cluster_labels, weights=cluster_coords[:, 1], minlength=n_clusters) / safe_weights,
+    ))
+
+    # Raio: distância máxima do centro a qualquer ponto do cluster
+    distances = haversine_vector(centers[cluster_labels], cluster_coords, unit=Unit.METERS)
+    radii = np.zeros(n_clusters, dtype=np.float64)
+    np.maximum.at(radii, cluster_labels, distances)
+
+    return [
+        HeatmapCircle(
+            latitude=lat,
+            longitude=lon,
+            radius_meters=radius,
+            weight=weight
+        )
+        for (lat, lon), radius, weight in zip(
+            centers[non_empty].tolist(),
+            radii[non_empty].tolist(),
+            weights[non_empty].tolist()
+        )
+    ]
+
+
+def cluster_with_postgis(
+        db: Session,
+        eps_km: float,
+        min_samples: int,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None
+) -> list[HeatmapCircle] | None:
+    """
+    Agrupa os relatos no próprio banco com ST_ClusterDBSCAN e calcula centro,
+    peso e raio máximo de cada cluster em SQL. Só os resumos dos clusters
+    trafegam pela rede.
+
+    Os pontos são projetados como (longitude * cos(latitude), latitude), o que
+    torna a distância euclidiana em graus proporcional à distância na superfície
+    para raios pequenos como o `eps_km`. O raio de cada cluster é medido na
+    esfera (ST_Distance sem esferoide), como o haversine do engine sklearn.
+
+    Retorna None se o banco não tiver a função (PostGIS sem ST_ClusterDBSCAN),
+    para que o chamador use o engine sklearn. Outros erros (ex: statement_timeout)
+    viram 503/500: cair no sklearn traria todos os pontos para o Python.
+    """
+    filtros = []
+    params = {
+        "eps_graus": math.degrees(eps_km / EARTH_RADIUS_KM),
+        "min_samples": min_samples,
+    }
+    if start_date:
+        filtros.append("data_furto >= :start_date")
+        params["start_date"] = start_date
+    if end_date:
+        filtros.append("data_furto <= :end_date")
+        params["end_date"] = end_date
+
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+
+    stmt = text(f"""
+        WITH pontos AS (
+            SELECT latitude,
+                   longitude,
+                   ST_ClusterDBSCAN(
+                       ST_MakePoint(longitude * cos(radians(latitude)), latitude),
+                       eps := :eps_graus,
+                       minpoints := :min_samples
+                   ) OVER () AS cluster_id
+            FROM relato
+            {where}
+        ),
+        centros AS (
+            SELECT cluster_id,
+                   AVG(latitude)  AS latitude,
+                   AVG(longitude) AS longitude,
+                   COUNT(*)       AS weight
+            FROM pontos
+            WHERE cluster_id IS NOT NULL
+            GROUP BY cluster_id
+        )
+        SELECT c.latitude,
+               c.longitude,
+               c.weight,
+               MAX(ST_Distance(
+                   ST_MakePoint(p.longitude, p.latitude)::geography,
+                   ST_MakePoint(c.longitude, c.latitude)::geography,
+                   false
+               )) AS radius_meters
+        FROM pontos p
+        JOIN centros c ON c.cluster_id = p.cluster_id
+        GROUP BY c.cluster_id, c.latitude, c.longitude, c.weight
+    """)
+
+    try:
+        rows = db.exec(stmt, params=params).all()
+    except DBAPIError as e:
+        db.rollback()
+        if isinstance(e.orig, psycopg.errors.UndefinedFunction):
+            print(f"ST_ClusterDBSCAN indisponível, usando sklearn: {e.orig}")
+            return None
+
+        print(f"Erro na clusterização no PostGIS: {e}")
+        if isinstance(e.orig, psycopg.errors.QueryCanceled):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="A clusterização excedeu o tempo limite. Tente um período menor."
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao calcular os clusters."
+        )
+
+    return [
+        HeatmapCircle(
+            latitude=row.latitude,
+            longitude=row.longitude,
+            radius_meters=row.radius_meters,
+            weight=row.weight
+        )
+        for row in rows
+    ]
+
+
+def quantize(coords: np.ndarray, precision: int | None) -> np.ndarray:
+    """Arredonda as coordenadas para `precision` casas decimais (None mantém como está)."""
+    if precision is None:
+        return coords
+    return np.round(coords, precision)
+
+
+def encode_polyline(coords: np.ndarray, precision: int = 5) -> str:
+    """
+    Codifica as coordenadas (n, 2) de [latitude, longitude] no formato
+    "Encoded Polyline" do Google, com a precisão informada (5 é o padrão do Google).
+
+    A codificação é vetorizada: deltas, zigzag e os blocos de 5 bits de todos
+    os valores são calculados com NumPy, sem laço em Python por ponto.
+    """
+    if len(coords) == 0:
+        return ""
+
+    scaled = np.round(coords * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+
+    # Zigzag: desloca 1 bit para a esquerda e inverte os bits dos negativos
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1).astype(np.uint64)
+
+    # Cada valor vira até 7 blocos de 5 bits (suficiente para 35 bits)
+    shifts = np.arange(7, dtype=np.uint64) * np.uint64(5)
+    shifted = values[:, None] >> shifts[None, :]
+    n_blocks = np.maximum(1, np.count_nonzero(shifted, axis=1))
+
+    block_index = np.arange(7)[None, :]
+    has_next = block_index < (n_blocks - 1)[:, None]
+    chars = (shifted & np.uint64(0x1F)) | (has_next.astype(np.uint64) << np.uint64(5))
+    chars += np.uint64(63)
+
+    keep = block_index < n_blocks[:, None]
+    return chars[keep].astype(np.uint8).tobytes().decode("ascii")
+
+
+def pack_binary(circles: list[HeatmapCircle], coords: np.ndarray) -> bytes:
+    """
+    Empacota a resposta do mapa de calor em binário little-endian:
+    - cabeçalho: uint32 quantidade de círculos, uint32 quantidade de pontos
+    - círculos: float32 [latitude, longitude, radius_meters, weight] por círculo
+    - pontos: float32 [latitude, longitude] por ponto
+    """
+    header = np.array([len(circles), len(coords)], dtype="<u4")
+    circles_array = np.array(
+        [[c.latitude, c.longitude, c.radius_meters, c.weight] for c in circles],
+        dtype="<f4"
+    ).reshape(-1, 4)
+    points_array = np.ascontiguousarray(coords, dtype="<f4")
+
+    return header.tobytes() + circles_array.tobytes() + points_array.tobytes()
+
+
+def grid_cell_size(zoom: int) -> float:
+    """Lado (em graus) da célula da grade no zoom informado: GRID_CELLS_PER_TILE células por tile."""
+    return 360.0 / (2 ** zoom) / GRID_CELLS_PER_TILE
+
+
+def _inicio_de_mes(data: datetime) -> bool:
+    return data == data.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _fim_de_mes(data: datetime) -> bool:
+    proximo_segundo = (data + timedelta(seconds=1)).replace(microsecond=0)
+    return proximo_segundo.day == 1 and proximo_segundo.time() == time.min
+
+
+def _pode_usar_rollup(zoom: int, start_date: datetime | None, end_date: datetime | None) -> bool:
+    """
+    O rollup é mensal, então só responde exatamente a filtros de data alinhados
+    a meses inteiros (início no primeiro instante do mês, fim no último segundo do mês).
+    """
+    if zoom > GRID_ROLLUP_MAX_ZOOM:
+        return False
+    if start_date and not _inicio_de_mes(start_date):
+        return False
+    if end_date and not _fim_de_mes(end_date):
+        return False
+    return True
+
+
+def get_grid_cells(
+        db: Session,
+        zoom: int,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        categoria_id: int | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None
+) -> HeatmapGridResponse:
+    """
+    Conta os relatos por célula de uma grade quadrada (ST_SnapToGrid) dentro do
+    bounding box. O tamanho da célula depende do zoom.
+
+    Nos zooms baixos (até GRID_ROLLUP_MAX_ZOOM) a contagem vem da tabela
+    relato_grid_rollup, pré-agregada por mês e categoria, e a consulta não toca
+    na tabela relato. Nos demais casos a agregação é feita na hora, usando o
+    índice GiST de localizacao_geog::geometry para o bounding box. Nos dois casos
+    entram as células cujo centro está dentro do bounding box.
+    """
+    tamanho = grid_cell_size(zoom)
+    params = {
+        "zoom": zoom,
+        "tamanho": tamanho,
+        "min_lat": min_lat,
+        "min_lon": min_lon,
+        "max_lat": max_lat,
+        "max_lon": max_lon,
+    }
+    filtros = []
+    if categoria_id is not None:
+        filtros.append("categoria_id = :categoria_id")
+        params["categoria_id"] = categoria_id
+
+    usar_rollup = _pode_usar_rollup(zoom, start_date, end_date)
+
+    if usar_rollup:
+        if start_date:
+            filtros.append("mes >= :start_mes")
+            params["start_mes"] = start_date.date()
+        if end_date:
+            filtros.append("mes <= :end_mes")
+            params["end_mes"] = end_date.date().replace(day=1)
+
+        where_extra = "".join(f" AND {filtro}" for filtro in filtros)
+        stmt = text(f"""
+            SELECT latitude, longitude, SUM(quantidade) AS quantidade
+            FROM relato_grid_rollup
+            WHERE zoom = :zoom
+              AND latitude BETWEEN :min_lat AND :max_lat
+              AND longitude BETWEEN :min_lon AND :max_lon
+              {where_extra}
+            GROUP BY latitude, longitude
+        """)
+    else:
+        if start_date:
+            filtros.append("data_furto >= :start_date")
+            params["start_date"] = start_date
+        if end_date:
+            filtros.append("data_furto <= :end_date")
+            params["end_date"] = end_date
+
+        # Mesmo recorte do rollup: pelo centro da célula, não pelo ponto. O envelope
+        # (em geometry, que não degenera em bboxes largos) é ampliado em uma célula
+        # para incluir os pontos de células de borda que caem fora do bbox.
+        where_extra = "".join(f" AND {filtro}" for filtro in filtros)
+        stmt = text(f"""
+            SELECT latitude, longitude, COUNT(*) AS quantidade
+            FROM (
+                SELECT ST_Y(celula) AS latitude, ST_X(celula) AS longitude
+                FROM (
+                    SELECT ST_SnapToGrid(ST_MakePoint(longitude, latitude), :tamanho) AS celula
+                    FROM relato
+                    WHERE localizacao_geog::geometry && ST_MakeEnvelope(
+                        :min_lon - :tamanho, :min_lat - :tamanho,
+                        :max_lon + :tamanho, :max_lat + :tamanho, 4326
+                    )
+                    {where_extra}
+                ) pontos
+            ) celulas
+            WHERE latitude BETWEEN :min_lat AND :max_lat
+              AND longitude BETWEEN :min_lon AND :max_lon
+            GROUP BY latitude, longitude
+        """)
+
+    rows = db.exec(stmt, params=params).all()
+
+    return HeatmapGridResponse(
+        zoom=zoom,
+        cell_size_degrees=tamanho,
+        source="rollup" if usar_rollup else "live",
+        cells=[
+            HeatmapGridCell(latitude=row.latitude, longitude=row.longitude, count=row.quantidade)
+            for row in rows
+        ]
+    )
+
+
+def rebuild_grid_rollups(db: Session) -> int:
+    """
+    Recalcula a tabela relato_grid_rollup (zooms 0 a GRID_ROLLUP_MAX_ZOOM, por mês e categoria).
+    Retorna a quantidade de linhas geradas.
+
+    Não faz commit nem controla concorrência: use maintenance_service.refresh_grid_rollups,
+    que roda o DELETE + INSERT sob o advisory lock de manutenção (dois recálculos
+    simultâneos colidiriam na chave primária) e sem statement_timeout. As leituras
+    continuam vendo a versão anterior até o commit.
+    """
+    db.exec(text("DELETE FROM relato_grid_rollup"))
+    result = db.exec(
+        text("""
+            INSERT INTO relato_grid_rollup (zoom, mes, categoria_id, latitude, longitude, quantidade)
+            SELECT z.zoom,
+                   date_trunc('month', r.data_furto)::date AS mes,
+                   r.categoria_id,
+                   ST_Y(s.celula) AS latitude,
+                   ST_X(s.celula) AS longitude,
+                   COUNT(*) AS quantidade
+            FROM relato r
+            CROSS JOIN generate_series(0, :max_zoom) AS z(zoom)
+            CROSS JOIN LATERAL (
+                SELECT ST_SnapToGrid(
+                    ST_MakePoint(r.longitude, r.latitude),
+                    360.0 / (2 ^ z.zoom) / :celulas_por_tile
+                ) AS celula
+            ) s
+            GROUP BY 1, 2, 3, 4, 5
+        """),
+        params={"max_zoom": GRID_ROLLUP_MAX_ZOOM, "celulas_por_tile": GRID_CELLS_PER_TILE}
+    )
+    return result.rowcount
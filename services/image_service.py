@@ -0,0 +1,134 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from fastapi import UploadFile, HTTPException, status
+from PIL import Image, ImageCms, ImageOps, UnidentifiedImageError
+
+# Maior lado (em pixels) da imagem salva e da miniatura
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2048"))
+IMAGE_THUMBNAIL_DIMENSION = int(os.getenv("IMAGE_THUMBNAIL_DIMENSION", "320"))
+# Formato de saída: WEBP ou JPEG
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_THUMBNAIL_QUALITY = int(os.getenv("IMAGE_THUMBNAIL_QUALITY", "70"))
+# Tamanho máximo aceito para o arquivo original
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+# Processos do pool. O pool é criado em cada worker do uvicorn, então o total no
+# host é IMAGE_WORKERS × workers: o padrão é pequeno para não disputar as CPUs
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "1"))
+
+if IMAGE_FORMAT not in ("WEBP", "JPEG"):
+    raise ValueError("IMAGE_FORMAT deve ser WEBP ou JPEG.")
+
+_CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+_EXTENSOES = {"WEBP": ".webp", "JPEG": ".jpg"}
+
+_SRGB = ImageCms.createProfile("sRGB")
+
+_executor: ProcessPoolExecutor | None = None
+
+
+class ProcessedImage(NamedTuple):
+    imagem: bytes
+    miniatura: bytes
+    content_type: str
+    extensao: str
+
+
+def _encode(imagem: Image.Image, qualidade: int) -> bytes:
+    saida = io.BytesIO()
+    if IMAGE_FORMAT == "JPEG":
+        imagem.save(saida, "JPEG", quality=qualidade, optimize=True, progressive=True)
+    else:
+        imagem.save(saida, "WEBP", quality=qualidade, method=4)
+    return saida.getvalue()
+
+
+def process_image_bytes(dados: bytes) -> ProcessedImage:
+    """
+    Decodifica a imagem, aplica a orientação do EXIF, reduz para IMAGE_MAX_DIMENSION
+    e gera a miniatura, reencodando ambas sem metadados (EXIF, GPS, ICC).
+
+    Roda dentro do pool de processos: recebe e devolve apenas bytes.
+    """
+    with Image.open(io.BytesIO(dados)) as original:
+        # Reduz já na decodificação quando o formato permite (JPEG)
+        original.draft("RGB", (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+        # Gira conforme o EXIF antes de descartá-lo, senão a foto fica deitada
+        imagem = ImageOps.exif_transpose(original)
+
+    tem_alfa = imagem.mode in ("RGBA", "LA", "PA") or "transparency" in imagem.info
+    modo = "RGBA" if tem_alfa and IMAGE_FORMAT == "WEBP" else "RGB"
+
+    # O perfil ICC será descartado: converte antes para sRGB (fotos Display P3 do iPhone)
+    icc = imagem.info.get("icc_profile")
+    if icc:
+        try:
+            imagem = ImageCms.profileToProfile(
+                imagem, ImageCms.ImageCmsProfile(io.BytesIO(icc)), _SRGB, outputMode=modo
+            )
+        except ImageCms.PyCMSError:
+            pass
+    if imagem.mode != modo:
+        imagem = imagem.convert(modo)
+
+    # Só os pixels seguem adiante: sem exif/icc/xmp no save
+    imagem.info.clear()
+
+    imagem.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.Resampling.LANCZOS)
+    principal = _encode(imagem, IMAGE_QUALITY)
+
+    imagem.thumbnail((IMAGE_THUMBNAIL_DIMENSION, IMAGE_THUMBNAIL_DIMENSION), Image.Resampling.LANCZOS)
+    miniatura = _encode(imagem, IMAGE_THUMBNAIL_QUALITY)
+
+    return ProcessedImage(principal, miniatura, _CONTENT_TYPES[IMAGE_FORMAT], _EXTENSOES[IMAGE_FORMAT])
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Pool de processos compartilhado, criado no primeiro uso."""
+    global _executor
+    if _executor is None:
+        # spawn: não herda o event loop nem as conexões abertas do processo da API
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Encerra o pool de processos (chamado no encerramento da aplicação)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def process_upload(file: UploadFile) -> ProcessedImage:
+    """
+    Lê o UploadFile e processa a imagem no pool de processos, sem ocupar o GIL
+    do worker que atende as requisições.
+    """
+    if file.size is not None and file.size > IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Imagem maior que {IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+        )
+
+    dados = await file.read(IMAGE_MAX_UPLOAD_BYTES + 1)
+    if len(dados) > IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Imagem maior que {IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+        )
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_executor(), process_image_bytes, dados)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError) as e:
+        print(f"Imagem inválida ({file.filename}): {e!r}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Não foi possível ler a imagem enviada."
+        )
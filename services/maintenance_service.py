@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+
+from sqlmodel import Session, text
+
+from database import engine
+import services.heatmap_service as heatmap_service
+from services.suggestion_service import SUGGESTION_CACHE
+
+# Views materializadas recalculadas periodicamente. Todas têm índice único,
+# então o REFRESH ... CONCURRENTLY não bloqueia as leituras.
+MATERIALIZED_VIEWS = (
+    "relato_stats_geral",
+    "relato_stats_categoria",
+    "relato_stats_serie",
+    "relato_sugestao",
+)
+
+# Intervalo (em segundos) entre as atualizações; 0 desativa o agendamento
+REFRESH_INTERVAL_SECONDS = float(os.getenv("MATVIEW_REFRESH_SECONDS", "120"))
+
+# Intervalo mínimo (em segundos) entre os recálculos da tabela relato_grid_rollup
+# (heatmap em zoom baixo), feitos pelo mesmo laço; 0 desativa
+GRID_ROLLUP_REFRESH_SECONDS = float(os.getenv("GRID_ROLLUP_REFRESH_SECONDS", "600"))
+
+# Chave do advisory lock: com vários workers, só um atualiza as views por vez
+_REFRESH_LOCK = "aricrimes:refresh_materialized_views"
+
+# Último recálculo do rollup feito por este processo (time.monotonic)
+_ultimo_grid_rollup: float | None = None
+
+
+def _lock_manutencao(db: Session) -> bool:
+    """
+    Tenta pegar o advisory lock de manutenção (liberado no fim da transação) e,
+    se conseguir, tira o statement_timeout da API: os recálculos percorrem a
+    tabela relato inteira. Sem o lock, desfaz a transação e retorna False.
+    """
+    adquirido = db.exec(
+        text("SELECT pg_try_advisory_xact_lock(hashtext(:chave))"),
+        params={"chave": _REFRESH_LOCK}
+    ).scalar()
+    if not adquirido:
+        db.rollback()
+        return False
+
+    db.exec(text("SET LOCAL statement_timeout = 0"))
+    return True
+
+
+def refresh_materialized_views(db: Session) -> bool:
+    """
+    Atualiza todas as views de MATERIALIZED_VIEWS em uma transação.
+    Retorna False (sem fazer nada) se outro processo já estiver atualizando.
+    """
+    if not _lock_manutencao(db):
+        return False
+
+    for view in MATERIALIZED_VIEWS:
+        db.exec(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+    db.commit()
+
+    SUGGESTION_CACHE.clear()
+    return True
+
+
+def refresh_grid_rollups(db: Session) -> int | None:
+    """
+    Recalcula a tabela relato_grid_rollup em uma transação, sob o mesmo lock das views.
+    Retorna a quantidade de linhas geradas, ou None se outro processo já estiver atualizando.
+    """
+    global _ultimo_grid_rollup
+    if not _lock_manutencao(db):
+        return None
+
+    linhas = heatmap_service.rebuild_grid_rollups(db)
+    db.commit()
+
+    _ultimo_grid_rollup = time.monotonic()
+    return linhas
+
+
+def _grid_rollup_vencido() -> bool:
+    if GRID_ROLLUP_REFRESH_SECONDS <= 0:
+        return False
+    return _ultimo_grid_rollup is None or time.monotonic() - _ultimo_grid_rollup >= GRID_ROLLUP_REFRESH_SECONDS
+
+
+def _refresh_with_new_session() -> bool:
+    with Session(engine) as db:
+        atualizou = refresh_materialized_views(db)
+        if atualizou and _grid_rollup_vencido():
+            refresh_grid_rollups(db)
+        return atualizou
+
+
+async def run_refresh_loop(interval_seconds: float = REFRESH_INTERVAL_SECONDS) -> None:
+    """
+    Laço em segundo plano (iniciado no lifespan) que atualiza as views a cada intervalo
+    e, a cada GRID_ROLLUP_REFRESH_SECONDS, a tabela relato_grid_rollup.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            # O refresh é síncrono e demorado: roda fora do event loop
+            await asyncio.to_thread(_refresh_with_new_session)
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar as views materializadas: {e}")
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response, status
+
+# Header em que as listagens devolvem o cursor da próxima página.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """
+    Serializa os valores da chave de ordenação (ex: data_furto e id do último item)
+    em um cursor opaco, seguro para ser usado em query string.
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """
+    Decodifica um cursor gerado por `encode_cursor`, convertendo cada valor
+    para o tipo esperado. Lança 400 se o cursor estiver corrompido.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("quantidade de valores inesperada")
+
+        return [
+            datetime.fromisoformat(value) if tipo is datetime else tipo(value)
+            for tipo, value in zip(types, payload)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido."
+        )
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    """Anexa o cursor da próxima página na resposta (se houver próxima página)."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import Sequence
+
+from fastapi import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import Relato, Usuario
+import services.relato_service as relato_service
+
+# Versões assíncronas das consultas do relato_service, para os endpoints `async def`.
+# As consultas são montadas pelos mesmos construtores do relato_service;
+# aqui só muda a forma de executá-las (AsyncSession).
+
+
+async def get_all_relatos(db: AsyncSession, offset: int, limit: int, cursor: str | None = None) -> Sequence[Relato]:
+    result = await db.exec(relato_service.all_relatos_query(offset, limit, cursor))
+    return result.all()
+
+
+async def get_latest_relatos(db: AsyncSession, offset: int, limit: int, cursor: str | None = None) -> Sequence[Relato]:
+    """Busca os relatos mais recentes: a mesma listagem de `get_all_relatos`."""
+    return await get_all_relatos(db, offset, limit, cursor)
+
+
+async def get_my_relatos(
+    db: AsyncSession,
+    offset: int,
+    limit: int,
+    uid: int,
+    cursor: str | None = None
+) -> Sequence[Relato]:
+    """Busca relatos dos usuários apenas"""
+    result = await db.exec(relato_service.relatos_by_user_id_query(uid, offset, limit, cursor))
+    return result.all()
+
+
+async def get_relato_by_id(db: AsyncSession, relato_id: int) -> Relato | None:
+    """Busca um relato específico pelo ID."""
+    result = await db.exec(relato_service.relato_by_id_query(relato_id))
+    return result.first()
+
+
+async def get_relatos_nearby(
+    db: AsyncSession,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: int,
+    cursor: str | None = None,
+    category_id: int | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None
+) -> Sequence[tuple[Relato, float]]:
+    query = relato_service.relatos_nearby_query(
+        latitude, longitude, radius_km, limit, cursor, category_id, start_date, end_date
+    )
+    result = await db.exec(query)
+    return result.all()
+
+
+async def get_relatos(db: AsyncSession, limit: int, cursor: str | None = None, **filtros) -> Sequence[Relato]:
+    result = await db.exec(relato_service.relatos_query(limit, cursor, **filtros))
+    return result.all()
+
+
+async def get_relatos_by_category(
+    db: AsyncSession,
+    category_id: int,
+    offset: int,
+    limit: int,
+    cursor: str | None = None
+) -> Sequence[Relato]:
+    result = await db.exec(relato_service.relatos_by_category_query(category_id, offset, limit, cursor))
+    return result.all()
+
+
+async def get_relatos_by_user_id(
+    db: AsyncSession,
+    user_id: int,
+    offset: int,
+    limit: int,
+    cursor: str | None = None
+) -> Sequence[Relato]:
+    result = await db.exec(relato_service.relatos_by_user_id_query(user_id, offset, limit, cursor))
+    return result.all()
+
+
+async def get_relatos_by_date_range(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: datetime,
+    offset: int,
+    limit: int,
+    cursor: str | None = None
+) -> Sequence[Relato]:
+    query = relato_service.relatos_by_date_range_query(start_date, end_date, offset, limit, cursor)
+    result = await db.exec(query)
+    return result.all()
+
+
+async def search_relatos(
+    db: AsyncSession,
+    query_text: str,
+    offset: int,
+    limit: int,
+    cursor: str | None = None,
+    headline: bool = False
+) -> Sequence[tuple[Relato, float, str | None]]:
+    result = await db.exec(relato_service.search_relatos_query(query_text, offset, limit, cursor, headline))
+    return result.all()
+
+
+async def toggle_confirmacao(db: AsyncSession, relato_id: int, user: Usuario):
+    relato = await db.get(Relato, relato_id)
+    if not relato:
+        raise HTTPException(status_code=404, detail="Relato não encontrado")
+
+    # Verifica se já existe confirmação
+    existing = (await db.exec(relato_service.confirmacao_query(relato_id, user.id))).first()
+
+    if existing:
+        # Se existe, remove (toggle off)
+        removida = (await db.exec(relato_service.remover_confirmacao_stmt(relato_id, user.id))).first()
+        # Só mexe no contador se esta requisição removeu a linha (outra pode ter removido antes)
+        delta = -1 if removida else 0
+        result = await db.exec(relato_service.incrementar_confirmacoes_stmt(relato_id, delta))
+        numero_confirmacoes = result.scalar_one()
+        await db.commit()
+        return {"message": "Confirmação removida", "confirmed": False, "numero_confirmacoes": numero_confirmacoes}
+    else:
+        # Se não existe, cria (toggle on)
+        inserida = (await db.exec(relato_service.inserir_confirmacao_stmt(relato_id, user.id))).first()
+        delta = 1 if inserida else 0
+        result = await db.exec(relato_service.incrementar_confirmacoes_stmt(relato_id, delta))
+        numero_confirmacoes = result.scalar_one()
+        await db.commit()
+        return {"message": "Ocorrência confirmada", "confirmed": True, "numero_confirmacoes": numero_confirmacoes}
@@ -0,0 +1,107 @@
+import csv
+import json
+from typing import BinaryIO, Iterable, Iterator
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlmodel import Session, text
+
+from dtos import RelatoCreateDto
+
+# Colunas copiadas para a tabela temporária, na ordem do COPY
+_COLUNAS = (
+    "obj_roubado",
+    "descricao",
+    "local",
+    "latitude",
+    "longitude",
+    "data_furto",
+    "data_registro",
+    "categoria_id",
+)
+
+
+def _erro_linha(numero: int, erro: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Linha {numero} inválida: {erro}"
+    )
+
+
+def _linhas_utf8(arquivo: BinaryIO) -> Iterator[str]:
+    """Decodifica o arquivo linha a linha; bytes que não são UTF-8 viram 400 com o número da linha."""
+    for numero, linha in enumerate(arquivo, start=1):
+        try:
+            yield linha.decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise _erro_linha(numero, e)
+
+
+def iter_ndjson(arquivo: BinaryIO) -> Iterator[RelatoCreateDto]:
+    """Lê um arquivo NDJSON (um relato JSON por linha) sob demanda, validando cada linha."""
+    for numero, linha in enumerate(_linhas_utf8(arquivo), start=1):
+        if not linha.strip():
+            continue
+        try:
+            yield RelatoCreateDto.model_validate(json.loads(linha))
+        except (ValueError, ValidationError) as e:
+            raise _erro_linha(numero, e)
+
+
+def iter_csv(arquivo: BinaryIO) -> Iterator[RelatoCreateDto]:
+    """Lê um CSV com cabeçalho (mesmos nomes de campo do RelatoCreateDto) sob demanda."""
+    leitor = csv.DictReader(_linhas_utf8(arquivo))
+    faltando = set(_COLUNAS) - set(leitor.fieldnames or [])
+    if faltando:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Colunas ausentes no CSV: {', '.join(sorted(faltando))}"
+        )
+
+    # A linha 1 é o cabeçalho
+    for numero, linha in enumerate(leitor, start=2):
+        try:
+            yield RelatoCreateDto.model_validate(linha)
+        except ValidationError as e:
+            raise _erro_linha(numero, e)
+
+
+def copy_relatos(db: Session, relatos: Iterable[RelatoCreateDto], usuario_id: int) -> int:
+    """
+    Insere os relatos em massa, associados a `usuario_id`. Retorna quantos foram criados.
+
+    Os relatos são enviados com COPY para uma tabela temporária à medida que o
+    iterável é consumido (sem materializar a lista) e depois vão para `relato` em um
+    único INSERT ... SELECT (o `search_vector` é gerado pelo banco).
+    Não faz commit: a transação é da sessão de quem chama.
+    """
+    db.exec(text("""
+        CREATE TEMP TABLE relato_import (
+            obj_roubado text,
+            descricao text,
+            local text,
+            latitude double precision,
+            longitude double precision,
+            data_furto timestamp,
+            data_registro timestamp,
+            categoria_id integer
+        ) ON COMMIT DROP
+    """))
+
+    # Conexão psycopg por baixo da sessão, para usar a mesma transação
+    conexao = db.connection().connection.driver_connection
+    with conexao.cursor() as cursor:
+        with cursor.copy(f"COPY relato_import ({', '.join(_COLUNAS)}) FROM STDIN") as copy:
+            for relato in relatos:
+                copy.write_row(tuple(getattr(relato, coluna) for coluna in _COLUNAS))
+
+    colunas = ", ".join(_COLUNAS)
+    resultado = db.exec(
+        text(f"""
+            INSERT INTO relato ({colunas}, usuario_id)
+            SELECT {colunas}, :usuario_id
+            FROM relato_import
+        """),
+        params={"usuario_id": usuario_id}
+    )
+    return resultado.rowcount
@@ -1,12 +1,62 @@
-from typing import Sequence
+from typing import Callable, Iterable, Sequence, TypeVar
 
 from fastapi import HTTPException, status
 
 from dtos import RelatoCreateDto
 from sqlmodel import Session, select, text
 from models import Relato, Usuario, ConfirmacaoRelato
+from sqlalchemy import Float, cast, delete, func, literal_column, null, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from datetime import datetime
+from services.pagination_service import encode_cursor, decode_cursor
+import services.tile_service as tile_service
+import services.relato_import_service as relato_import_service
+
+# Coluna geography gerada pelo banco (não mapeada no modelo) e indexada com GiST.
+_LOCALIZACAO_GEOG = literal_column("relato.localizacao_geog")
+# A mesma coluna como geometry, como no índice GiST ix_relato_localizacao_geom_gist
+_LOCALIZACAO_GEOM = literal_column("relato.localizacao_geog::geometry")
+
+T = TypeVar("T")
+
+
+def _paginate_by_data_furto(query, offset: int, limit: int, cursor: str | None = None):
+    """
+    Ordena por (data_furto, id) decrescente e aplica a paginação.
+    Com `cursor` usa keyset (seek) a partir do último item da página anterior,
+    o que mantém o custo constante em páginas profundas; sem cursor, usa offset.
+
+    Busca `limit + 1` linhas: a linha a mais só indica que há próxima página
+    e é descartada por `split_page`.
+    """
+    query = query.order_by(Relato.data_furto.desc(), Relato.id.desc())
+
+    if cursor:
+        data_furto, relato_id = decode_cursor(cursor, datetime, int)
+        return (
+            query
+            .where(tuple_(Relato.data_furto, Relato.id) < tuple_(data_furto, relato_id))
+            .limit(limit + 1)
+        )
+
+    return query.offset(offset).limit(limit + 1)
+
+
+def _split_page(rows: Sequence[T], limit: int, chave: Callable[[T], tuple]) -> tuple[list[T], str | None]:
+    """
+    Separa a página das linhas buscadas com `limit + 1`. Só há próxima página
+    se a linha a mais veio; o cursor é gerado a partir do último item da página.
+    """
+    pagina = list(rows[:limit])
+    if len(rows) <= limit:
+        return pagina, None
+    return pagina, encode_cursor(*chave(pagina[-1]))
+
+
+def split_page(relatos: Sequence[Relato], limit: int) -> tuple[list[Relato], str | None]:
+    """Página de relatos e o cursor da próxima, ou None se esta foi a última."""
+    return _split_page(relatos, limit, lambda relato: (relato.data_furto, relato.id))
 
 def create_relato(relato: RelatoCreateDto, user: Usuario, db: Session):
     try:
@@ -14,23 +64,12 @@ def create_relato(relato: RelatoCreateDto, user: Usuario, db: Session):
 
         db_relato.usuario_id = user.id
 
+        # O search_vector é gerado pelo próprio Postgres no INSERT
         db.add(db_relato)
         db.commit()
         db.refresh(db_relato)
 
-        # Atualiza o search_vector via SQL puro para garantir a sintaxe correta do Postgres
-        stmt = text("""
-                    UPDATE relato
-                    SET search_vector = to_tsvector('portuguese', :texto)
-                    WHERE id = :id
-                    """)
-        texto_busca = f"{db_relato.obj_roubado} {db_relato.descricao}"
-        db.exec(stmt, params={"texto": texto_busca, "id": db_relato.id})
-        db.commit()
-
-
-        db.refresh(db_relato)
-
+        tile_service.invalidate_point(db_relato.latitude, db_relato.longitude)
 
         return db_relato
     except Exception as e:
@@ -38,69 +77,133 @@ def create_relato(relato: RelatoCreateDto, user: Usuario, db: Session):
         raise HTTPException(status_code=500, detail=f'Erro ao criar o relato {e}')
 
 
-def toggle_confirmacao(db: Session, relato_id: int, user: Usuario):
-    relato = db.get(Relato, relato_id)
-    if not relato:
-        raise HTTPException(status_code=404, detail="Relato não encontrado")
-
-    # Verifica se já existe confirmação
-    stmt = select(ConfirmacaoRelato).where(
+# Construtores das consultas do toggle de confirmação (executado em
+# relato_async_service.toggle_confirmacao)
+def confirmacao_query(relato_id: int, usuario_id: int):
+    return select(ConfirmacaoRelato).where(
         ConfirmacaoRelato.relato_id == relato_id,
-        ConfirmacaoRelato.usuario_id == user.id
+        ConfirmacaoRelato.usuario_id == usuario_id
     )
-    existing = db.exec(stmt).first()
-
-    if existing:
-        # Se existe, remove (toggle off)
-        db.delete(existing)
-        db.commit()
-        return {"message": "Confirmação removida", "confirmed": False}
-    else:
-        # Se não existe, cria (toggle on)
-        nova_conf = ConfirmacaoRelato(relato_id=relato_id, usuario_id=user.id)
-        db.add(nova_conf)
-        db.commit()
-        return {"message": "Ocorrência confirmada", "confirmed": True}
 
 
-def search_relatos(db: Session, query_text: str, offset: int, limit: int) -> Sequence[Relato]:
-    # Usa o operador @@ do Postgres para Full Text Search
-    stmt = (
-        select(Relato)
-        .where(text("search_vector @@ plainto_tsquery('portuguese', :q)"))
-        .params(q=query_text)
-        .options(
-            selectinload(Relato.fotos),
-            selectinload(Relato.confirmacoes)
+def remover_confirmacao_stmt(relato_id: int, usuario_id: int):
+    """DELETE ... RETURNING da confirmação: não retorna linha se ela já tinha sido removida."""
+    return (
+        delete(ConfirmacaoRelato)
+        .where(
+            ConfirmacaoRelato.relato_id == relato_id,
+            ConfirmacaoRelato.usuario_id == usuario_id
         )
-        .offset(offset)
-        .limit(limit)
+        .returning(ConfirmacaoRelato.relato_id)
+    )
+
+
+def inserir_confirmacao_stmt(relato_id: int, usuario_id: int):
+    """INSERT ... ON CONFLICT DO NOTHING RETURNING: não retorna linha se a confirmação já existia."""
+    return (
+        insert(ConfirmacaoRelato)
+        .values(relato_id=relato_id, usuario_id=usuario_id, data_confirmacao=datetime.now())
+        .on_conflict_do_nothing()
+        .returning(ConfirmacaoRelato.relato_id)
+    )
+
+
+def incrementar_confirmacoes_stmt(relato_id: int, delta: int):
+    """
+    Atualiza o contador de confirmações do relato na mesma transação da
+    inserção/remoção da confirmação. O incremento é feito no próprio UPDATE,
+    então toggles concorrentes não perdem contagens. Retorna o novo valor.
+
+    `delta` deve refletir as linhas de fato removidas/inseridas (0 quando um toggle
+    concorrente chegou antes); com 0 o UPDATE só lê o valor atual.
+    """
+    return (
+        update(Relato)
+        .where(Relato.id == relato_id)
+        .values(numero_confirmacoes=Relato.numero_confirmacoes + delta)
+        .returning(Relato.numero_confirmacoes)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Opções do ts_headline: até 2 trechos de 5 a 20 palavras com os termos encontrados
+_HEADLINE_OPTIONS = "MaxFragments=2, MinWords=5, MaxWords=20, StartSel=<b>, StopSel=</b>"
+
+
+def search_relatos_query(
+    query_text: str,
+    offset: int,
+    limit: int,
+    cursor: str | None = None,
+    headline: bool = False
+):
+    """
+    Busca textual (Full Text Search) no obj_roubado e na descrição.
+    Retorna tuplas (relato, rank, headline), da mais relevante para a menos relevante.
+
+    - `query_text` aceita a sintaxe do `websearch_to_tsquery`: "frase exata", `or` e `-termo`.
+    - O filtro @@ usa o índice GIN ix_relato_search_vector; o rank é o `ts_rank_cd`.
+    - Com `cursor`, pagina por keyset sobre (rank, id); sem ele, usa offset.
+      Busca `limit + 1` linhas, separadas depois por `split_search_page`.
+    - Com `headline`, traz um trecho da descrição com os termos destacados (`ts_headline`).
+      O Postgres só o calcula para as linhas que sobram depois do ORDER BY/LIMIT.
+    """
+    tsquery = func.websearch_to_tsquery(literal_column("'portuguese'::regconfig"), query_text)
+    # ts_rank_cd devolve `real`; em double precision o valor que volta no cursor é exato
+    rank = cast(func.ts_rank_cd(Relato.search_vector, tsquery), Float)
+
+    trecho = (
+        func.ts_headline(literal_column("'portuguese'::regconfig"), Relato.descricao, tsquery, _HEADLINE_OPTIONS)
+        if headline else null()
     )
-    return db.exec(stmt).all()
 
-def get_all_relatos(db: Session, offset: int, limit: int) -> Sequence[Relato]:
     query = (
-        select(Relato)
-        .options(
-            selectinload(Relato.fotos),
-            selectinload(Relato.confirmacoes)  # <-- Carrega a lista para podermos contar
-        )
-        .offset(offset)
-        .limit(limit)
+        select(Relato, rank.label("rank"), trecho.label("headline"))
+        .where(Relato.search_vector.op("@@")(tsquery))
+        .options(selectinload(Relato.fotos))
+        .order_by(rank.desc(), Relato.id.desc())
     )
-    relatos = db.exec(query).all()
-    return relatos
 
+    if cursor:
+        rank_cursor, relato_id = decode_cursor(cursor, float, int)
+        return query.where(tuple_(rank, Relato.id) < tuple_(rank_cursor, relato_id)).limit(limit + 1)
+
+    return query.offset(offset).limit(limit + 1)
 
-def get_relato_by_id(db: Session, relato_id: int) -> Relato | None:
-    """Busca um relato específico pelo ID."""
+
+def search_relatos(
+    db: Session,
+    query_text: str,
+    offset: int,
+    limit: int,
+    cursor: str | None = None,
+    headline: bool = False
+) -> Sequence[tuple[Relato, float, str | None]]:
+    return db.exec(search_relatos_query(query_text, offset, limit, cursor, headline)).all()
+
+
+def split_search_page(
+    rows: Sequence[tuple[Relato, float, str | None]],
+    limit: int
+) -> tuple[list[tuple[Relato, float, str | None]], str | None]:
+    """Página da busca textual e o cursor da próxima, ou None se esta foi a última."""
+    return _split_page(rows, limit, lambda row: (row[1], row[0].id))
+
+
+def all_relatos_query(offset: int, limit: int, cursor: str | None = None):
     query = (
+        select(Relato)
+        .options(selectinload(Relato.fotos))
+    )
+    return _paginate_by_data_furto(query, offset, limit, cursor)
+
+
+def relato_by_id_query(relato_id: int):
+    return (
         select(Relato)
         .where(Relato.id == relato_id)
-        .options(selectinload(Relato.fotos), selectinload(Relato.confirmacoes))
+        .options(selectinload(Relato.fotos))
     )
-    relato = db.exec(query).first()
-    return relato
 
 
 def update_relato(db: Session, relato_id: int, relato_data: RelatoCreateDto, user: Usuario) -> Relato | None:
@@ -118,6 +221,9 @@ def update_relato(db: Session, relato_id: int, relato_data: RelatoCreateDto, use
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Usuário não autorizado a modificar este relato")
 
+    # Guarda a posição antiga para invalidar os tiles de onde o ponto saiu
+    posicao_antiga = (db_relato.latitude, db_relato.longitude)
+
     # Atualiza os campos do DTO
     relato_dict = relato_data.model_dump(exclude_unset=True)
     for key, value in relato_dict.items():
@@ -127,6 +233,10 @@ def update_relato(db: Session, relato_id: int, relato_data: RelatoCreateDto, use
         db.add(db_relato)
         db.commit()
         db.refresh(db_relato)
+
+        tile_service.invalidate_point(*posicao_antiga)
+        tile_service.invalidate_point(db_relato.latitude, db_relato.longitude)
+
         return db_relato
     except Exception as e:
         db.rollback()
@@ -148,163 +258,183 @@ def delete_relato(db: Session, relato_id: int, user: Usuario, is_admin: bool = F
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Usuário não autorizado a deletar este relato")
 
+    posicao = (db_relato.latitude, db_relato.longitude)
+
     try:
         db.delete(db_relato)
         db.commit()
+
+        tile_service.invalidate_point(*posicao)
+
         return True
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f'Erro ao deletar o relato: {e}')
 
 
-def get_latest_relatos(db: Session, offset: int, limit: int) -> Sequence[Relato]:
-    """Busca os relatos mais recentes ordenados por data de registro."""
-    relatos = db.exec(
-        select(Relato)
-        .options(selectinload(Relato.fotos), selectinload(Relato.confirmacoes))
-        .order_by(Relato.data_furto.desc())
-        .offset(offset)
-        .limit(limit)
-    ).all()
-    return relatos
-
-def get_my_relatos(db: Session, offset: int, limit: int, uid: int) -> Sequence[Relato]:
-    """Busca relatos dos usuários apenas"""
-    relatos = db.exec(
-        select(Relato)
-        .where(Relato.usuario_id == uid)
-        .options(selectinload(Relato.fotos), selectinload(Relato.confirmacoes))
-        .order_by(Relato.data_furto.desc())
-        .offset(offset)
-        .limit(limit)
-    ).all()
-    return relatos
-
-
-def get_relatos_nearby(db: Session, latitude: float, longitude: float, radius_km: float) -> Sequence[Relato]:
-    """
-    Busca relatos próximos (filtrando em memória).
-    NOTA: Isso é ineficiente para muitos dados. O ideal seria usar PostGIS (ST_DWithin),
-    mas como 'haversine' já está no projeto, usei ele para filtrar em Python
-    sem adicionar novas dependências de banco.
+def relatos_nearby_query(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: int,
+    cursor: str | None = None,
+    category_id: int | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None
+):
     """
-    # Pega todos os relatos (ineficiente, mas funciona sem PostGIS)
-
-    radius_em_metros = radius_km * 1000
-
-    ponto_central_wkt = f'POINT({longitude} {latitude})'
-
-    stmt = text(
-        """
-        SELECT id
-        FROM relato
-        WHERE ST_DWithin(
-                      localizacao_geog,
-                      ST_GeogFromText(:ponto_wkt),
-                      :raio_metros
-              )
-        """
-    )
+    Busca relatos em um raio (em Km) de um ponto central, do mais próximo ao mais distante.
+    Retorna pares (relato, distância em metros).
 
-    # Executa a consulta com segurança, passando os parâmetros
-    params = {"ponto_wkt": ponto_central_wkt, "raio_metros": radius_em_metros}
-    ids_dos_relatos = db.exec(stmt, params).scalars().all()
-
-    if not ids_dos_relatos:
-        return []
+    Uma única consulta: o ST_DWithin e a ordenação pelo operador KNN (<->) usam
+    o índice GiST ix_relato_localizacao_geog_gist. A paginação por cursor é feita
+    sobre (distância, id) e busca `limit + 1` linhas (ver `split_nearby_page`).
+    """
+    ponto_central = func.ST_GeogFromText(f'SRID=4326;POINT({longitude} {latitude})')
+    distancia = _LOCALIZACAO_GEOG.op("<->", return_type=Float)(ponto_central)
 
-    # Etapa 2: Buscar os objetos Relato completos com suas fotos (eficiente)
     query = (
-        select(Relato)
-        .where(Relato.id.in_(ids_dos_relatos))
-        .options(selectinload(Relato.fotos), selectinload(Relato.confirmacoes))
+        select(Relato, distancia.label("distance_m"))
+        .where(func.ST_DWithin(_LOCALIZACAO_GEOG, ponto_central, radius_km * 1000))
+        .options(selectinload(Relato.fotos))
     )
-    relatos = db.exec(query).all()
 
-    return relatos
+    if category_id is not None:
+        query = query.where(Relato.categoria_id == category_id)
+    if start_date:
+        query = query.where(Relato.data_furto >= start_date)
+    if end_date:
+        query = query.where(Relato.data_furto <= end_date)
 
+    if cursor:
+        distancia_cursor, relato_id = decode_cursor(cursor, float, int)
+        query = query.where(tuple_(distancia, Relato.id) > tuple_(distancia_cursor, relato_id))
 
-def create_relatos_batch(relatos_data: list[RelatoCreateDto], admin_user: Usuario, db: Session) -> int:
+    return query.order_by(distancia, Relato.id).limit(limit + 1)
+
+
+def split_nearby_page(
+    rows: Sequence[tuple[Relato, float]],
+    limit: int
+) -> tuple[list[tuple[Relato, float]], str | None]:
+    """Página do /nearby e o cursor da próxima, ou None se esta foi a última."""
+    return _split_page(rows, limit, lambda row: (row[1], row[0].id))
+
+
+def relatos_query(
+    limit: int,
+    cursor: str | None = None,
+    category_id: int | None = None,
+    user_id: int | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    bbox: tuple[float, float, float, float] | None = None,
+    center: tuple[float, float] | None = None,
+    radius_km: float | None = None,
+    query_text: str | None = None
+):
     """
-    Cria múltiplos relatos em lote e atualiza corretamente o vetor de busca (Full Text Search).
-    Todos os relatos serão associados ao usuário admin que está fazendo o upload.
-    Retorna a contagem de relatos criados.
+    Combina os filtros das rotas específicas em uma única consulta, sempre
+    ordenada por (data_furto, id) decrescente e paginada por cursor.
+
+    Cada filtro tem um índice que o atende:
+    - categoria / usuário: ix_relato_categoria_data_furto_id / ix_relato_usuario_data_furto_id,
+      que também entregam a ordenação e o seek do cursor;
+    - período: ix_relato_data_furto_id;
+    - `bbox` (min_lat, min_lon, max_lat, max_lon): GiST de localizacao_geog::geometry;
+    - `center` + `radius_km`: GiST de localizacao_geog;
+    - `query_text` (sintaxe do websearch_to_tsquery): GIN de search_vector.
     """
-    count = 0
-    created_relatos = []
+    query = select(Relato).options(selectinload(Relato.fotos))
+
+    if category_id is not None:
+        query = query.where(Relato.categoria_id == category_id)
+    if user_id is not None:
+        query = query.where(Relato.usuario_id == user_id)
+    if start_date:
+        query = query.where(Relato.data_furto >= start_date)
+    if end_date:
+        query = query.where(Relato.data_furto <= end_date)
+
+    if bbox:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        envelope = func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
+        # && em geometry usa o índice ix_relato_localizacao_geom_gist (em geography o
+        # envelope vira uma caixa geocêntrica, maior que o retângulo pedido, e degenera
+        # com 180° ou mais de largura); a conferência exata é feita por lat/lon
+        query = query.where(
+            _LOCALIZACAO_GEOM.op("&&")(envelope),
+            Relato.latitude.between(min_lat, max_lat),
+            Relato.longitude.between(min_lon, max_lon)
+        )
 
-    try:
-        # 1. Inserir todos os relatos
-        for relato_dto in relatos_data:
-            db_relato = Relato(**relato_dto.model_dump())
-            db_relato.usuario_id = admin_user.id
-            db.add(db_relato)
-            created_relatos.append(db_relato)
-            count += 1
-
-        # Commit inicial para que os IDs sejam gerados
-        db.commit()
+    if center and radius_km:
+        latitude, longitude = center
+        ponto_central = func.ST_GeogFromText(f'SRID=4326;POINT({longitude} {latitude})')
+        query = query.where(func.ST_DWithin(_LOCALIZACAO_GEOG, ponto_central, radius_km * 1000))
 
-        # 2. Atualizar o search_vector de cada relato recém-criado
-        stmt = text("""
-                    UPDATE relato
-                    SET search_vector = to_tsvector('portuguese', :texto)
-                    WHERE id = :id
-                    """)
+    if query_text:
+        tsquery = func.websearch_to_tsquery(literal_column("'portuguese'::regconfig"), query_text)
+        query = query.where(Relato.search_vector.op("@@")(tsquery))
 
-        for relato in created_relatos:
-            # Refresh garante que temos os dados atualizados (e o ID válido)
-            db.refresh(relato)
-            texto_busca = f"{relato.obj_roubado} {relato.descricao}"
-            db.exec(stmt, params={"texto": texto_busca, "id": relato.id})
+    return _paginate_by_data_furto(query, 0, limit, cursor)
 
-        # Commit final para salvar os vetores
-        db.commit()
 
-        return count
+def create_relatos_batch(relatos_data: Iterable[RelatoCreateDto], admin_user: Usuario, db: Session) -> int:
+    """
+    Cria múltiplos relatos em lote (o vetor de busca é gerado pelo banco).
+    Todos os relatos serão associados ao usuário admin que está fazendo o upload.
+    `relatos_data` pode ser um gerador: os relatos são enviados ao banco via COPY
+    conforme são lidos. Retorna a contagem de relatos criados.
+    """
+    try:
+        count = relato_import_service.copy_relatos(db, relatos_data, admin_user.id)
+        db.commit()
+    except HTTPException:
+        # Erros de validação de uma linha do arquivo
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f'Erro ao criar relatos em lote: {e}')
 
+    tile_service.invalidate_all()
+
+    return count
+
 
 # 1. Obter relatos por Categoria
-def get_relatos_by_category(db: Session, category_id: int, offset: int, limit: int) -> Sequence[Relato]:
+def relatos_by_category_query(category_id: int, offset: int, limit: int, cursor: str | None = None):
     query = (
         select(Relato)
         .where(Relato.categoria_id == category_id)
-        .options(selectinload(Relato.fotos), selectinload(Relato.confirmacoes))
-        .order_by(Relato.data_furto.desc())
-        .offset(offset)
-        .limit(limit)
+        .options(selectinload(Relato.fotos))
     )
-    return db.exec(query).all()
+    return _paginate_by_data_furto(query, offset, limit, cursor)
+
 
 # 2. Obter relatos por Usuário Específico (Público)
-def get_relatos_by_user_id(db: Session, user_id: int, offset: int, limit: int) -> Sequence[Relato]:
+def relatos_by_user_id_query(user_id: int, offset: int, limit: int, cursor: str | None = None):
     query = (
         select(Relato)
         .where(Relato.usuario_id == user_id)
-        .options(selectinload(Relato.fotos), selectinload(Relato.confirmacoes))
-        .offset(offset)
-        .limit(limit)
+        .options(selectinload(Relato.fotos))
     )
-    return db.exec(query).all()
+    return _paginate_by_data_furto(query, offset, limit, cursor)
+
 
 # 3. Obter relatos por Intervalo de Datas
-def get_relatos_by_date_range(
-    db: Session,
+def relatos_by_date_range_query(
     start_date: datetime,
     end_date: datetime,
     offset: int,
-    limit: int
-) -> Sequence[Relato]:
+    limit: int,
+    cursor: str | None = None
+):
     query = (
         select(Relato)
         .where(Relato.data_furto >= start_date)
         .where(Relato.data_furto <= end_date)
-        .options(selectinload(Relato.fotos), selectinload(Relato.confirmacoes))
-        .order_by(Relato.data_furto.desc())
-        .offset(offset)
-        .limit(limit)
+        .options(selectinload(Relato.fotos))
     )
-    return db.exec(query).all()
\ No newline at end of file
+    return _paginate_by_data_furto(query, offset, limit, cursor)
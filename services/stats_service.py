@@ -1,29 +1,134 @@
-from sqlmodel import Session, select, func, text
-from models import Relato, Categoria
-from datetime import datetime, timedelta
+from datetime import datetime
 
+from sqlmodel import Session, text
+
+from dtos.stats.stats_series_response import StatsSeriesPoint, StatsSeriesResponse
 
-def get_general_stats(db: Session):
-    total_relatos = db.exec(select(func.count(Relato.id))).one()
 
-    data_limite = datetime.now() - timedelta(days=30)
-    relatos_30_dias = db.exec(
-        select(func.count(Relato.id)).where(Relato.data_furto >= data_limite)
+# As contagens vêm das views materializadas relato_stats_geral e relato_stats_categoria,
+# recalculadas periodicamente pelo maintenance_service. Assim a leitura não depende
+# do tamanho da tabela relato; `atualizado_em` informa de quando são os números.
+
+def get_general_stats(db: Session):
+    row = db.exec(
+        text("SELECT total_geral, total_30_dias, atualizado_em FROM relato_stats_geral")
     ).one()
 
     return {
-        "total_geral": total_relatos,
-        "total_30_dias": relatos_30_dias
+        "total_geral": row.total_geral,
+        "total_30_dias": row.total_30_dias,
+        "atualizado_em": row.atualizado_em
     }
 
 
 def get_stats_by_category(db: Session):
-    # Query agrupada por categoria
-    stmt = (
-        select(Categoria.nome, func.count(Relato.id))
-        .join(Relato, Categoria.id == Relato.categoria_id)
-        .group_by(Categoria.nome)
-    )
-    results = db.exec(stmt).all()
-
-    return [{"categoria": r[0], "quantidade": r[1]} for r in results]
\ No newline at end of file
+    results = db.exec(
+        text("SELECT categoria, quantidade, atualizado_em FROM relato_stats_categoria ORDER BY categoria")
+    ).all()
+
+    return [
+        {"categoria": r.categoria, "quantidade": r.quantidade, "atualizado_em": r.atualizado_em}
+        for r in results
+    ]
+
+
+_PASSO_BUCKET = {"day": "1 day", "week": "1 week", "month": "1 month"}
+
+
+def get_series(
+        db: Session,
+        bucket: str,
+        categoria_id: int | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+        bbox: tuple[float, float, float, float] | None = None
+) -> StatsSeriesResponse:
+    """
+    Série temporal da quantidade de relatos por bucket (`day`, `week` ou `month`) da data_furto.
+    O período é arredondado para buckets inteiros.
+
+    Sem `bbox`, os buckets fechados vêm da view relato_stats_serie e só os posteriores
+    ao último bucket dela são contados na tabela relato (em geral, apenas o bucket
+    aberto). Com `bbox` (min_lat, min_lon, max_lat, max_lon), que a view não
+    guarda, tudo é contado na hora, com o índice GiST de localizacao_geog::geometry.
+    """
+    params = {"bucket": bucket, "passo": _PASSO_BUCKET[bucket]}
+
+    filtros_relato = []
+    filtros_serie = []
+    if categoria_id is not None:
+        filtros_relato.append("categoria_id = :categoria_id")
+        filtros_serie.append("categoria_id = :categoria_id")
+        params["categoria_id"] = categoria_id
+    if start_date:
+        filtros_relato.append("data_furto >= date_trunc(:bucket, CAST(:start_date AS timestamp))")
+        filtros_serie.append("bucket >= date_trunc(:bucket, CAST(:start_date AS timestamp))")
+        params["start_date"] = start_date
+    if end_date:
+        filtros_relato.append(
+            "data_furto < date_trunc(:bucket, CAST(:end_date AS timestamp)) + CAST(:passo AS interval)"
+        )
+        filtros_serie.append("bucket <= date_trunc(:bucket, CAST(:end_date AS timestamp))")
+        params["end_date"] = end_date
+
+    if bbox:
+        params.update(zip(("min_lat", "min_lon", "max_lat", "max_lon"), bbox))
+        # && em geometry para o índice; a conferência exata (contido no bbox) por lat/lon
+        filtros_relato.append(
+            "localizacao_geog::geometry && ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326)"
+        )
+        filtros_relato.append("latitude BETWEEN :min_lat AND :max_lat")
+        filtros_relato.append("longitude BETWEEN :min_lon AND :max_lon")
+        where = " AND ".join(filtros_relato) or "TRUE"
+        stmt = text(f"""
+            SELECT date_trunc(:bucket, data_furto) AS bucket, COUNT(*) AS quantidade
+            FROM relato
+            WHERE {where}
+            GROUP BY 1
+            ORDER BY 1
+        """)
+        source = "live"
+    else:
+        # Tudo a partir do bucket seguinte ao último da view é contado na hora. O limite
+        # é buscado antes (consulta pelo índice da view) para chegar como constante ao
+        # planejador, que assim usa o índice de data_furto na parte ao vivo.
+        inicio_ao_vivo = db.exec(
+            text("""
+                SELECT max(bucket) + CAST(:passo AS interval)
+                FROM relato_stats_serie
+                WHERE granularidade = :bucket
+            """),
+            params=params
+        ).scalar()
+
+        if inicio_ao_vivo is not None:
+            filtros_relato.append("data_furto >= :inicio_ao_vivo")
+            filtros_serie.append("bucket < :inicio_ao_vivo")
+            params["inicio_ao_vivo"] = inicio_ao_vivo
+
+        where_relato = "".join(f" AND {filtro}" for filtro in filtros_relato)
+        where_serie = "".join(f" AND {filtro}" for filtro in filtros_serie)
+        stmt = text(f"""
+            SELECT bucket, SUM(quantidade) AS quantidade
+            FROM (
+                SELECT bucket, quantidade
+                FROM relato_stats_serie
+                WHERE granularidade = :bucket
+                  {where_serie}
+                UNION ALL
+                SELECT date_trunc(:bucket, data_furto), COUNT(*)
+                FROM relato
+                WHERE TRUE
+                  {where_relato}
+                GROUP BY 1
+            ) t
+            GROUP BY bucket
+            ORDER BY bucket
+        """)
+        source = "rollup"
+
+    pontos = [
+        StatsSeriesPoint(bucket=row.bucket, quantidade=row.quantidade)
+        for row in db.exec(stmt, params=params).all()
+    ]
+    return StatsSeriesResponse(bucket=bucket, source=source, pontos=pontos)
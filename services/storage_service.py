@@ -1,7 +1,11 @@
+import asyncio
 import os
-import requests
+from typing import Iterable, NamedTuple, Sequence
+
+import httpx
 from fastapi import UploadFile, HTTPException, status
-from requests.exceptions import RequestException
+
+import services.image_service as image_service
 
 # Carrega a configuração do ambiente
 FILE_SERVER_UPLOAD_URL = os.getenv("FILE_SERVER_UPLOAD_URL")
@@ -10,67 +14,178 @@ FILE_SERVER_SECRET = os.getenv("FILE_SERVER_SECRET")
 if not FILE_SERVER_UPLOAD_URL or not FILE_SERVER_SECRET:
     raise ValueError("FILE_SERVER_UPLOAD_URL e FILE_SERVER_SECRET devem ser definidos.")
 
+# Timeouts (em segundos): conexão e, separadamente, envio/leitura de cada bloco
+FILE_SERVER_CONNECT_TIMEOUT = float(os.getenv("FILE_SERVER_CONNECT_TIMEOUT", "5"))
+FILE_SERVER_TIMEOUT = float(os.getenv("FILE_SERVER_TIMEOUT", "30"))
+# Novas tentativas após falha de rede ou resposta 502/503/504
+FILE_SERVER_RETRIES = int(os.getenv("FILE_SERVER_RETRIES", "2"))
+FILE_SERVER_MAX_CONNECTIONS = int(os.getenv("FILE_SERVER_MAX_CONNECTIONS", "20"))
+# Quantos arquivos de um mesmo envio em lote são encaminhados ao mesmo tempo
+FILE_SERVER_UPLOAD_CONCURRENCY = int(os.getenv("FILE_SERVER_UPLOAD_CONCURRENCY", "4"))
 
-def proxy_file_to_storage(file: UploadFile) -> str:
-    """
-    Encaminha (proxy) um UploadFile para o serviço de ficheiros interno,
-    autenticando-se com um header secreto.
+_RETRY_STATUS = {502, 503, 504}
 
-    Retorna a URL pública final que o serviço de ficheiros nos devolveu.
-    """
+_client: httpx.AsyncClient | None = None
 
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Tipo de arquivo inválido. Apenas imagens são permitidas."
+
+def get_client() -> httpx.AsyncClient:
+    """Cliente HTTP assíncrono compartilhado (pool de conexões keep-alive com o file-server)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(FILE_SERVER_TIMEOUT, connect=FILE_SERVER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=FILE_SERVER_MAX_CONNECTIONS,
+                max_keepalive_connections=FILE_SERVER_MAX_CONNECTIONS
+            ),
+            headers={"x-upload-secret": FILE_SERVER_SECRET}
         )
+    return _client
 
-    headers = {
-        "x-upload-secret": FILE_SERVER_SECRET
-    }
 
-    # Prepara o ficheiro para ser "repassado"
-    files_to_upload = {
-        'file': (file.filename, file.file, file.content_type)
-    }
+async def close_client() -> None:
+    """Fecha o pool de conexões (chamado no encerramento da aplicação)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
-    try:
-        # Faz o pedido para o seu file-server (Node)
-        response = requests.post(
-            FILE_SERVER_UPLOAD_URL,
-            headers=headers,
-            files=files_to_upload
-        )
 
-        response.raise_for_status()  # Lança exceção para erros (401, 403, 500)
+class StoredImage(NamedTuple):
+    url: str
+    thumbnail_url: str
 
-        response_data = response.json()
 
-        # O seu serviço Node DEVE retornar um JSON como: {"url": "https://..."}
-        if "url" not in response_data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Serviço de ficheiros não retornou uma URL válida."
+async def _post_with_retry(dados: bytes, filename: str, content_type: str) -> httpx.Response:
+    # Os bytes já estão em memória: o httpx monta o multipart e envia o Content-Length
+    files = {"file": (filename, dados, content_type)}
+
+    for tentativa in range(FILE_SERVER_RETRIES + 1):
+        ultima = tentativa == FILE_SERVER_RETRIES
+        try:
+            response = await get_client().post(
+                FILE_SERVER_UPLOAD_URL,
+                files=files
             )
+            if response.status_code not in _RETRY_STATUS or ultima:
+                return response
+            print(f"File-server respondeu {response.status_code}, tentando de novo ({tentativa + 1})")
+        except httpx.TransportError as e:
+            if ultima:
+                raise
+            print(f"Erro de rede ao contactar file-server, tentando de novo ({tentativa + 1}): {e!r}")
 
-        return response_data["url"]
+        # Espera crescente entre as tentativas (0.2s, 0.4s, 0.8s...)
+        await asyncio.sleep(0.2 * 2 ** tentativa)
 
-    except RequestException as e:
-        print(f"Erro de rede ao contactar file-server: {e}")
+
+async def upload_bytes_to_storage(dados: bytes, filename: str, content_type: str) -> str:
+    """
+    Envia um arquivo já em memória ao serviço de ficheiros interno,
+    autenticando-se com um header secreto.
+
+    O envio é assíncrono (não bloqueia o event loop) e reaproveita
+    as conexões do pool; falhas de rede e respostas 502/503/504 são repetidas.
+
+    Retorna a URL pública final que o serviço de ficheiros nos devolveu.
+    """
+    try:
+        response = await _post_with_retry(dados, filename, content_type)
+    except httpx.TransportError as e:
+        print(f"Erro de rede ao contactar file-server: {e!r}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Não foi possível conectar ao serviço de ficheiros."
         )
-    except Exception as e:
-        print(f"Erro ao encaminhar ficheiro: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=f"Erro do serviço de ficheiros: {e.response.text}"
-            )
+
+    if response.is_error:
+        print(f"Erro ao encaminhar ficheiro: {response.status_code} {response.text}")
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Erro do serviço de ficheiros: {response.text}"
+        )
+
+    try:
+        response_data = response.json()
+    except ValueError:
+        response_data = {}
+
+    # O serviço Node DEVE retornar um JSON como: {"url": "https://..."}
+    if "url" not in response_data:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erro desconhecido no upload."
+            detail="Serviço de ficheiros não retornou uma URL válida."
         )
+
+    return response_data["url"]
+
+
+def report_orphaned(urls: Iterable[str], motivo: str) -> None:
+    """
+    Registra no log arquivos salvos no file-server que nenhuma foto vai referenciar.
+    O file-server não tem rota de remoção: a limpeza é feita a partir do log.
+    """
+    for url in urls:
+        print(f"Arquivo órfão no file-server ({motivo}): {url}")
+
+
+async def proxy_file_to_storage(file: UploadFile) -> StoredImage:
+    """
+    Processa a imagem enviada (ver image_service: sem EXIF, reduzida e reencodada)
+    e encaminha a versão final e a miniatura para o serviço de ficheiros.
+
+    Retorna as URLs públicas da imagem e da miniatura.
+    """
+
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tipo de arquivo inválido. Apenas imagens são permitidas."
+        )
+
+    try:
+        processada = await image_service.process_upload(file)
     finally:
-        file.file.close()
\ No newline at end of file
+        await file.close()
+
+    nome = os.path.splitext(os.path.basename(file.filename or ""))[0] or "foto"
+    # return_exceptions: um envio que falha não cancela o outro no meio do caminho
+    url, thumbnail_url = await asyncio.gather(
+        upload_bytes_to_storage(processada.imagem, f"{nome}{processada.extensao}", processada.content_type),
+        upload_bytes_to_storage(processada.miniatura, f"{nome}_thumb{processada.extensao}", processada.content_type),
+        return_exceptions=True
+    )
+
+    erros = [resultado for resultado in (url, thumbnail_url) if isinstance(resultado, BaseException)]
+    if erros:
+        report_orphaned([salvo for salvo in (url, thumbnail_url) if isinstance(salvo, str)], "envio do par falhou")
+        raise erros[0]
+
+    return StoredImage(url, thumbnail_url)
+
+
+async def proxy_files_to_storage(files: Sequence[UploadFile]) -> list[StoredImage | HTTPException]:
+    """
+    Encaminha vários arquivos ao serviço de ficheiros em paralelo, no máximo
+    FILE_SERVER_UPLOAD_CONCURRENCY de cada vez.
+
+    Retorna, na mesma ordem de `files`, as URLs de cada arquivo ou a
+    HTTPException que impediu o envio dele (a falha de um não cancela os outros).
+    Erros inesperados (ex.: pool de processamento de imagens quebrado) viram 500.
+    """
+    semaforo = asyncio.Semaphore(FILE_SERVER_UPLOAD_CONCURRENCY)
+
+    async def enviar(file: UploadFile) -> StoredImage | HTTPException:
+        async with semaforo:
+            try:
+                return await proxy_file_to_storage(file)
+            except HTTPException as e:
+                return e
+            except Exception as e:
+                print(f"Erro inesperado ao enviar {file.filename}: {e!r}")
+                return HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Erro inesperado ao processar ou enviar o arquivo."
+                )
+
+    return list(await asyncio.gather(*(enviar(file) for file in files)))
@@ -0,0 +1,65 @@
+import os
+
+from sqlmodel import Session, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dtos.relatos.relato_sugestao import RelatoSugestaoDto
+from services.cache_service import LRUCache
+
+# Sugestões dos prefixos mais digitados. Curto, pois a view também é atualizada periodicamente.
+SUGGESTION_CACHE = LRUCache(
+    maxsize=int(os.getenv("SUGGESTION_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("SUGGESTION_CACHE_TTL", "300"))
+)
+
+
+def _escape_like(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def get_suggestions(
+        db: AsyncSession,
+        q: str,
+        limit: int,
+        campo: str | None = None
+) -> list[RelatoSugestaoDto]:
+    """
+    Sugere termos de obj_roubado/local para o texto parcial `q` ("celu" -> "Celular").
+
+    Busca na view relato_sugestao (termos distintos), com o índice de trigramas:
+    primeiro os termos que começam com `q`, depois os mais parecidos
+    (word_similarity, tolera erros de digitação) e, no empate, os mais frequentes.
+    """
+    chave = q.strip().lower()
+    cache_key = (chave, limit, campo)
+    cached = SUGGESTION_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    filtro_campo = "AND campo = :campo" if campo else ""
+    params = {"q": chave, "prefixo": f"{_escape_like(chave)}%", "limit": limit}
+    if campo:
+        params["campo"] = campo
+
+    result = await db.exec(
+        text(f"""
+            SELECT campo, termo, word_similarity(:q, chave) AS similaridade, quantidade
+            FROM relato_sugestao
+            WHERE (chave LIKE :prefixo OR :q <% chave)
+            {filtro_campo}
+            ORDER BY chave LIKE :prefixo DESC, similaridade DESC, quantidade DESC, chave
+            LIMIT :limit
+        """),
+        params=params
+    )
+    sugestoes = [RelatoSugestaoDto.model_validate(row._mapping) for row in result.all()]
+
+    SUGGESTION_CACHE.set(cache_key, sugestoes)
+    return sugestoes
+
+
+def refresh_suggestions(db: Session) -> None:
+    """Atualiza a view relato_sugestao sem bloquear as leituras (CONCURRENTLY) e limpa o cache."""
+    db.exec(text("REFRESH MATERIALIZED VIEW CONCURRENTLY relato_sugestao"))
+    db.commit()
+    SUGGESTION_CACHE.clear()
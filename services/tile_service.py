@@ -0,0 +1,104 @@
+import math
+import os
+from datetime import datetime
+
+from sqlmodel import Session, text
+
+from services.cache_service import LRUCache
+
+TILE_MAX_ZOOM = 22
+
+# Cache dos tiles já gerados, por (z, x, y, filtros).
+# É por worker: a invalidação feita nas escritas só alcança o cache do próprio
+# processo, então os itens expiram após TILE_CACHE_TTL segundos para limitar o
+# tempo em que os outros workers servem tiles desatualizados.
+TILE_CACHE = LRUCache(
+    maxsize=int(os.getenv("TILE_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("TILE_CACHE_TTL", "60"))
+)
+
+# Latitude máxima representável em Web Mercator (EPSG:3857)
+_MAX_MERCATOR_LAT = 85.0511287798
+
+
+def tile_for_point(latitude: float, longitude: float, z: int) -> tuple[int, int]:
+    """Retorna o (x, y) do tile de zoom `z` que contém o ponto (esquema XYZ / slippy map)."""
+    n = 2 ** z
+    lat_rad = math.radians(max(-_MAX_MERCATOR_LAT, min(_MAX_MERCATOR_LAT, latitude)))
+
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def get_tile(
+        db: Session,
+        z: int,
+        x: int,
+        y: int,
+        categoria_id: int | None = None,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None
+) -> bytes:
+    """
+    Gera (ou busca no cache) o Mapbox Vector Tile com os relatos do tile z/x/y.
+    Cada feição é um ponto com os atributos `id` e `categoria_id`, na camada "relatos".
+
+    O filtro espacial é feito em geometry (índice GiST ix_relato_localizacao_geom_gist):
+    em geography, os envelopes de z=0 e z=1 (180° ou mais de largura) degeneram.
+    """
+    cache_key = (z, x, y, categoria_id, start_date, end_date)
+    cached = TILE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    filtros = []
+    params = {"z": z, "x": x, "y": y}
+    if categoria_id is not None:
+        filtros.append("r.categoria_id = :categoria_id")
+        params["categoria_id"] = categoria_id
+    if start_date:
+        filtros.append("r.data_furto >= :start_date")
+        params["start_date"] = start_date
+    if end_date:
+        filtros.append("r.data_furto <= :end_date")
+        params["end_date"] = end_date
+
+    where_extra = "".join(f" AND {filtro}" for filtro in filtros)
+
+    stmt = text(f"""
+        WITH limites AS (
+            SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+        ),
+        feicoes AS (
+            SELECT ST_AsMVTGeom(ST_Transform(r.localizacao_geog::geometry, 3857), l.geom) AS geom,
+                   r.id,
+                   r.categoria_id
+            FROM relato r, limites l
+            WHERE r.localizacao_geog::geometry && ST_Transform(l.geom, 4326)
+            {where_extra}
+        )
+        SELECT ST_AsMVT(feicoes.*, 'relatos', 4096, 'geom') FROM feicoes
+    """)
+
+    tile = db.exec(stmt, params=params).scalar()
+    tile = bytes(tile) if tile else b""
+
+    TILE_CACHE.set(cache_key, tile)
+    return tile
+
+
+def invalidate_point(latitude: float, longitude: float) -> None:
+    """Remove do cache todos os tiles (de qualquer zoom e filtro) que contêm o ponto."""
+
+    def contem_ponto(key) -> bool:
+        z, x, y = key[:3]
+        return (x, y) == tile_for_point(latitude, longitude, z)
+
+    TILE_CACHE.delete_where(contem_ponto)
+
+
+def invalidate_all() -> None:
+    """Esvazia o cache de tiles (usado em cargas em lote)."""
+    TILE_CACHE.clear()